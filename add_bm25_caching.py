@@ -1,13 +1,19 @@
 #!/usr/bin/env python3
 """
 Complete the optimizations by adding BM25 caching to search_repository
+
+Edits server.py as a concrete syntax tree (libcst) so the patch is applied in a
+single parse, survives formatting drift, and reports targets it cannot find.
 """
+import sys
 
-# Read the file
-with open('server.py', 'r', encoding='utf-8') as f:
-    content = f.read()
+try:
+    import libcst as cst
+except ImportError:
+    print("❌ libcst is required: pip install libcst")
+    sys.exit(1)
 
-# 1. Add the get_bm25_retriever helper function before refresh_index
+# 1. The get_bm25_retriever helper function inserted before refresh_index
 helper_function = '''
 def get_bm25_retriever(index, chroma_collection, top_k: int):
     """
@@ -53,51 +59,124 @@ def get_bm25_retriever(index, chroma_collection, top_k: int):
 
 '''
 
-# Insert helper function before @mcp.tool() for refresh_index
-refresh_marker = '@mcp.tool()\\ndef refresh_index('
-if refresh_marker in content:
-    content = content.replace(refresh_marker, helper_function + refresh_marker)
-
-# 2. Replace BM25 construction in search_repository with cached call
-old_bm25_code = '''        # 1. BM25 Retriever (Sparse)
-        # We construct it from the docstore of the loaded index
-        # Note: This builds the BM25 index in memory, which is fast for <5k files
-        retriever_bm25 = None
-        try:
-            nodes = list(index.docstore.docs.values())
-            if not nodes:
-                logger.info("Docstore empty, fetching nodes from ChromaDB for BM25...")
-                data = chroma_collection.get()
-                if data and data['documents']:
-                    for i, text in enumerate(data['documents']):
-                        # Reconstruct TextNode
-                        # Note: We might lose some node attributes not stored in metadata/text
-                        # but it's enough for BM25
-                        node = TextNode(
-                            text=text, 
-                            id_=data['ids'][i], 
-                            metadata=data['metadatas'][i] if data['metadatas'] else {}
-                        )
-                        nodes.append(node)
-            
-            logger.info(f"Building BM25 index from {len(nodes)} nodes...")
-            if nodes:
-                retriever_bm25 = BM25Retriever.from_defaults(
-                    nodes=nodes,
-                    similarity_top_k=top_k * 3 # Fetch more candidates for fusion
-                )
-            else:
-                logger.warning("No nodes found for BM25.")
-        except Exception as e:
-            logger.error(f"Failed to initialize BM25Retriever: {e}")'''
-
-new_bm25_code = '''        # 1. BM25 Retriever (Sparse) - with caching for performance
-        retriever_bm25 = get_bm25_retriever(index, chroma_collection, top_k)'''
-
-content = content.replace(old_bm25_code, new_bm25_code)
+BM25_BLOCK_COMMENT = "# 1. BM25 Retriever (Sparse)"
+
+# 2. Cached call replacing the inline BM25 construction in search_repository
+new_bm25_comment = "# 1. BM25 Retriever (Sparse) - with caching for performance"
+new_bm25_code = "retriever_bm25 = get_bm25_retriever(index, chroma_collection, top_k)\n"
+
+
+def _is_mcp_tool(decorator: cst.Decorator) -> bool:
+    """Check whether a decorator is @mcp.tool or @mcp.tool()."""
+    target = decorator.decorator
+    if isinstance(target, cst.Call):
+        target = target.func
+    return (
+        isinstance(target, cst.Attribute)
+        and isinstance(target.value, cst.Name)
+        and target.value.value == "mcp"
+        and target.attr.value == "tool"
+    )
+
+
+def _has_leading_comment(statement: cst.CSTNode, text: str) -> bool:
+    """Check whether any comment line directly above a statement starts with text."""
+    return any(
+        line.comment is not None and line.comment.value.startswith(text)
+        for line in getattr(statement, "leading_lines", ())
+    )
+
+
+class AddBM25Cache(cst.CSTTransformer):
+    """
+    Insert get_bm25_retriever before the refresh_index tool and replace the
+    inline BM25 construction in search_repository with a call to it.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.in_search_repository = False
+        self.helper_inserted = False
+        self.block_replaced = False
+
+    def visit_FunctionDef(self, node: cst.FunctionDef) -> None:
+        if node.name.value == "search_repository":
+            self.in_search_repository = True
+
+    def leave_FunctionDef(
+        self, original_node: cst.FunctionDef, updated_node: cst.FunctionDef
+    ) -> cst.FunctionDef:
+        if original_node.name.value == "search_repository":
+            self.in_search_repository = False
+        return updated_node
+
+    def leave_IndentedBlock(
+        self, original_node: cst.IndentedBlock, updated_node: cst.IndentedBlock
+    ) -> cst.IndentedBlock:
+        if not self.in_search_repository or self.block_replaced:
+            return updated_node
+
+        body = list(updated_node.body)
+        for i, statement in enumerate(body):
+            # The block is "retriever_bm25 = None" (carrying the comment) + its try:
+            if not _has_leading_comment(statement, BM25_BLOCK_COMMENT):
+                continue
+            end = i + 1
+            if end < len(body) and isinstance(body[end], cst.Try):
+                end += 1
+            # Keep blank lines above the old block, swap its comments for ours
+            leading_lines = [
+                line for line in statement.leading_lines if line.comment is None
+            ]
+            leading_lines.append(cst.EmptyLine(comment=cst.Comment(new_bm25_comment)))
+            replacement = cst.parse_statement(new_bm25_code)
+            body[i:end] = [replacement.with_changes(leading_lines=leading_lines)]
+            self.block_replaced = True
+            return updated_node.with_changes(body=body)
+
+        return updated_node
+
+    def leave_Module(self, original_node: cst.Module, updated_node: cst.Module) -> cst.Module:
+        already_defined = any(
+            isinstance(statement, cst.FunctionDef)
+            and statement.name.value == "get_bm25_retriever"
+            for statement in updated_node.body
+        )
+        if already_defined:
+            self.helper_inserted = True
+            return updated_node
+
+        body = list(updated_node.body)
+        for i, statement in enumerate(body):
+            if (
+                isinstance(statement, cst.FunctionDef)
+                and statement.name.value == "refresh_index"
+                and any(_is_mcp_tool(d) for d in statement.decorators)
+            ):
+                helper = cst.parse_statement(helper_function.strip() + "\n")
+                body[i:i] = [helper.with_changes(
+                    leading_lines=[cst.EmptyLine(indent=False)] * 2
+                )]
+                self.helper_inserted = True
+                return updated_node.with_changes(body=body)
+
+        return updated_node
+
+
+# Read the file
+with open('server.py', 'r', encoding='utf-8') as f:
+    module = cst.parse_module(f.read())
+
+transformer = AddBM25Cache()
+module = module.visit(transformer)
+
+if not transformer.helper_inserted:
+    print("⚠️  refresh_index tool not found; get_bm25_retriever was not inserted.")
+if not transformer.block_replaced:
+    print(f"⚠️  '{BM25_BLOCK_COMMENT}' block not found in search_repository; left unchanged.")
 
 # Write the output
 with open('server.py', 'w', encoding='utf-8') as f:
-    f.write(content)
+    f.write(module.code)
 
 print("BM25 caching optimizations applied successfully!")
@@ -4,46 +4,30 @@ Apply fixes for user feedback:
 1. Fix REPO_ROOT definition order
 2. Add CodeSplitter fallback
 3. Update transformations to use variable
-"""
-
-with open('server.py', 'r', encoding='utf-8') as f:
-    content = f.read()
 
-# Fix 1: REPO_ROOT definition
-# Find where logger is initialized and add REPO_ROOT before LOG_FILE usage
-old_logging = '''# server.py に追加（ファイル先を Desktop に固定）
-import os
-import sys
-import logging
-from logging.handlers import RotatingFileHandler
- # 例: server.py の logging 初期化のすぐ後に追加
-logger = logging.getLogger("mutagen-rag")
-LOG_FILE = os.getenv("MCP_LOG_FILE", str(REPO_ROOT / "mcp_server.log"))'''
-
-new_logging = '''# server.py に追加（ファイル先を Desktop に固定）
-import os
+Edits server.py as a concrete syntax tree (libcst) so each fix is located by
+structure rather than exact whitespace, and missing targets are reported.
+"""
 import sys
-import logging
-from logging.handlers import RotatingFileHandler
 
-# ワークスペース直下（このファイルが存在するフォルダ）をルートにする
-REPO_ROOT = Path(__file__).resolve().parent
-# ロガー初期化
-logger = logging.getLogger("mutagen-rag")
-LOG_FILE = os.getenv("MCP_LOG_FILE", str(REPO_ROOT / "mcp_server.log"))'''
+try:
+    import libcst as cst
+    import libcst.matchers as m
+except ImportError:
+    print("❌ libcst is required: pip install libcst")
+    sys.exit(1)
 
-content = content.replace(old_logging, new_logging)
+# Fix 1: REPO_ROOT definition (inserted before the logger is created)
+repo_root_comment = "# ワークスペース直下（このファイルが存在するフォルダ）をルートにする"
+repo_root_code = "REPO_ROOT = Path(__file__).resolve().parent\n"
 
 # Fix 2: CodeSplitter fallback
-old_codesplitter = '''# Configuration
-# Set chunk size to 2048 and overlap to 200 for better code context
-Settings.chunk_size = 2048
-Settings.chunk_overlap = 200'''
-
-new_codesplitter = '''# Configuration
-# Code splitter for C# - chunk by semantic code blocks rather than tokens
-# Falls back to default splitting if tree-sitter is unavailable
-try:
+# Replaces "Settings.chunk_size = 2048" / "Settings.chunk_overlap = 200"
+codesplitter_comments = [
+    "# Code splitter for C# - chunk by semantic code blocks rather than tokens",
+    "# Falls back to default splitting if tree-sitter is unavailable",
+]
+codesplitter_code = '''try:
     from llama_index.core.node_parser import CodeSplitter
     code_splitter = CodeSplitter(
         language="c_sharp",
@@ -55,12 +39,99 @@ try:
     logger.info("CodeSplitter (C#) initialized successfully.")
 except ImportError as e:
     logger.warning(f"Tree-sitter or CodeSplitter not available: {e}. Falling back to default splitting.")
-    transformations_list = []  # Use default LlamaIndex splitting'''
+    transformations_list = []  # Use default LlamaIndex splitting
+'''
+
+# logger = logging.getLogger(...)
+LOGGER_ASSIGN = m.SimpleStatementLine(body=[m.Assign(
+    targets=[m.AssignTarget(target=m.Name("logger"))],
+    value=m.Call(func=m.Attribute(value=m.Name("logging"), attr=m.Name("getLogger"))),
+)])
+
+# REPO_ROOT = ...
+REPO_ROOT_ASSIGN = m.SimpleStatementLine(body=[m.Assign(
+    targets=[m.AssignTarget(target=m.Name("REPO_ROOT"))]
+)])
+
+
+def _settings_assign(attr: str) -> m.SimpleStatementLine:
+    """Match a module-level 'Settings.<attr> = ...' statement."""
+    return m.SimpleStatementLine(body=[m.Assign(
+        targets=[m.AssignTarget(target=m.Attribute(value=m.Name("Settings"), attr=m.Name(attr)))]
+    )])
+
+
+def _with_comments(statement: cst.CSTNode, comments, keep_from: cst.CSTNode = None) -> cst.CSTNode:
+    """Attach comment lines above a statement, keeping existing blank/comment lines."""
+    leading_lines = list(keep_from.leading_lines) if keep_from is not None else []
+    leading_lines.extend(cst.EmptyLine(comment=cst.Comment(c)) for c in comments)
+    return statement.with_changes(leading_lines=leading_lines)
+
+
+class ApplyFixes(cst.CSTTransformer):
+    """Apply the REPO_ROOT and CodeSplitter fixes to the module body."""
+
+    def __init__(self):
+        super().__init__()
+        self.repo_root_fixed = False
+        self.codesplitter_fixed = False
+
+    def leave_Module(self, original_node: cst.Module, updated_node: cst.Module) -> cst.Module:
+        body = list(updated_node.body)
+
+        # Fix 1: define REPO_ROOT right before the logger if it isn't defined yet
+        if any(m.matches(statement, REPO_ROOT_ASSIGN) for statement in body):
+            self.repo_root_fixed = True
+        else:
+            for i, statement in enumerate(body):
+                if m.matches(statement, LOGGER_ASSIGN):
+                    repo_root = _with_comments(
+                        cst.parse_statement(repo_root_code),
+                        [repo_root_comment],
+                        keep_from=statement,
+                    )
+                    body[i] = statement.with_changes(leading_lines=[
+                        cst.EmptyLine(comment=cst.Comment("# ロガー初期化"))
+                    ])
+                    body.insert(i, repo_root)
+                    self.repo_root_fixed = True
+                    break
+
+        # Fix 2: replace the chunk_size/chunk_overlap pair with CodeSplitter fallback
+        for i, statement in enumerate(body[:-1]):
+            if (
+                m.matches(statement, _settings_assign("chunk_size"))
+                and m.matches(body[i + 1], _settings_assign("chunk_overlap"))
+            ):
+                # Drop the old chunk comments but keep the section header above them
+                keep = statement.with_changes(leading_lines=[
+                    line for line in statement.leading_lines
+                    if line.comment is None or "chunk" not in line.comment.value.lower()
+                ])
+                body[i:i + 2] = [_with_comments(
+                    cst.parse_statement(codesplitter_code),
+                    codesplitter_comments,
+                    keep_from=keep,
+                )]
+                self.codesplitter_fixed = True
+                break
+
+        return updated_node.with_changes(body=body)
+
+
+with open('server.py', 'r', encoding='utf-8') as f:
+    module = cst.parse_module(f.read())
+
+transformer = ApplyFixes()
+module = module.visit(transformer)
 
-content = content.replace(old_codesplitter, new_codesplitter)
+if not transformer.repo_root_fixed:
+    print("⚠️  logger assignment not found; REPO_ROOT was not added.")
+if not transformer.codesplitter_fixed:
+    print("⚠️  Settings.chunk_size/chunk_overlap not found; CodeSplitter fallback not added.")
 
 # Write
 with open('server.py', 'w', encoding='utf-8') as f:
-    f.write(content)
+    f.write(module.code)
 
 print("✅ Fixes applied successfully!")
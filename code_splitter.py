@@ -0,0 +1,391 @@
+"""
+Code splitting module for Mutagen RAG system.
+Provides a faster drop-in replacement for LlamaIndex's CodeSplitter.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, List, Optional, Sequence, Tuple
+
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from llama_index.core.callbacks import CBEventType, EventPayload
+from llama_index.core.node_parser import CodeSplitter
+from llama_index.core.node_parser.node_utils import build_nodes_from_splits
+from llama_index.core.schema import BaseNode
+from llama_index.core.utils import get_tqdm_iterable
+
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# BLAKE3 is optional; hashlib's blake2b keys the chunk cache without it
+try:
+    from blake3 import blake3 as _content_hasher
+except ImportError:
+    _content_hasher = hashlib.blake2b
+
+# Part of every chunk cache key; bump it whenever the chunking algorithm's
+# output changes, so refreshes never serve chunks cached by an older version
+CHUNKER_VERSION = 2
+
+# tree-sitter-language-pack renamed some grammars between releases (c_sharp
+# became csharp in 0.7), so each name falls back to its other spelling
+_LANGUAGE_ALIASES = {"c_sharp": "csharp", "csharp": "c_sharp"}
+
+
+@lru_cache(maxsize=None)
+def get_parser(language: str) -> Any:
+    """
+    Get the shared tree-sitter parser for a language, creating it on first use.
+    
+    Args:
+        language: tree-sitter language name (e.g., "c_sharp"); the installed
+            language pack's spelling of the name is used if it differs
+        
+    Returns:
+        tree_sitter.Parser instance
+        
+    Raises:
+        ImportError: If tree_sitter_language_pack is not installed
+        LookupError: If the language pack has no grammar for the language
+    """
+    import tree_sitter_language_pack
+    
+    try:
+        return tree_sitter_language_pack.get_parser(language)
+    except LookupError:
+        if language not in _LANGUAGE_ALIASES:
+            raise
+        return tree_sitter_language_pack.get_parser(_LANGUAGE_ALIASES[language])
+
+
+class FastCodeSplitter(CodeSplitter):
+    """
+    CodeSplitter with an iterative, span-based chunker.
+    
+    Produces the same chunk boundaries as CodeSplitter, but tracks chunks as
+    byte offsets and decodes each chunk once, instead of decoding and
+    concatenating a string per AST child. Sizes are measured as CodeSplitter
+    measures them: each child in UTF-8 bytes, the chunk it is added to in
+    characters.
+    
+    With cache_dir set, the chunks of each file are stored on disk keyed by a
+    hash of its content, so unchanged files are not re-parsed on refresh.
+    Each cache hit refreshes the entry's mtime, so prune_cache() can delete
+    entries that no refresh has used for cache_max_age_days.
+    
+    With num_workers > 1, documents are split on a thread pool. tree-sitter
+    releases the GIL while parsing (the bulk of the work), and each worker
+    thread parses with its own Parser, since Parser objects are not thread-safe.
+    """
+    
+    cache_dir: Optional[str] = Field(
+        default=None,
+        description="Directory for the content-hash chunk cache (None = disabled)."
+    )
+    num_workers: int = Field(
+        default=1,
+        description="Number of threads splitting documents in parallel."
+    )
+    cache_max_age_days: Optional[float] = Field(
+        default=None,
+        description="Age in days after which unused cache entries are pruned (None = never)."
+    )
+    
+    _local: Any = PrivateAttr(default=None)
+    _executor: Optional[ThreadPoolExecutor] = PrivateAttr(default=None)
+    
+    def __init__(
+        self,
+        language: str,
+        parser: Optional[Any] = None,
+        cache_dir: Optional[str] = None,
+        num_workers: int = 1,
+        cache_max_age_days: Optional[float] = None,
+        **kwargs: Any
+    ) -> None:
+        """
+        Initialize the splitter, reusing the shared parser for the language.
+        
+        Args:
+            language: tree-sitter language name (e.g., "c_sharp")
+            parser: Optional tree-sitter Parser; defaults to the shared one
+            cache_dir: Optional directory for cached chunks of unchanged files
+            num_workers: Number of threads splitting documents in parallel
+                (capped at the CPU count)
+            cache_max_age_days: Days after which prune_cache() deletes unused
+                cache entries (None = never)
+            **kwargs: Remaining CodeSplitter arguments (chunk_lines, max_chars, ...)
+        """
+        super().__init__(language=language, parser=parser or get_parser(language), **kwargs)
+        self.cache_dir = cache_dir
+        self.num_workers = max(1, min(num_workers, os.cpu_count() or 1))
+        self.cache_max_age_days = cache_max_age_days
+        self._local = threading.local()
+    
+    @classmethod
+    def class_name(cls) -> str:
+        return "FastCodeSplitter"
+    
+    def split_text(self, text: str) -> List[str]:
+        """
+        Split code into chunks, reusing cached chunks for previously seen content.
+        
+        Args:
+            text: The source code text to split
+            
+        Returns:
+            List of code chunks
+            
+        Raises:
+            ValueError: If the code cannot be parsed for the specified language
+        """
+        if self.cache_dir is None:
+            return self._split_uncached(text)
+        
+        cache_path = self._cache_path(text)
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                chunks = json.load(f)
+            # Mark the entry as used so age-based pruning keeps it
+            os.utime(cache_path)
+            return chunks
+        except (OSError, ValueError):
+            pass
+        
+        chunks = self._split_uncached(text)
+        
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            # Write then rename so an interrupted refresh never leaves a torn entry
+            tmp_path = cache_path.with_suffix(f".{threading.get_ident()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(chunks, f)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.warning(f"Failed to write chunk cache entry {cache_path}: {e}")
+        
+        return chunks
+    
+    def prune_cache(self) -> int:
+        """
+        Delete chunk cache entries that were not used for cache_max_age_days.
+        
+        Entries of deleted or edited files (and of old settings or chunker
+        versions) are never read again, so without pruning the cache would
+        only grow. Pruning by age rather than by what one refresh used keeps
+        the entries of repositories indexed by other refresh calls. Leftover
+        temp files of interrupted writes age out the same way.
+        
+        Returns:
+            Number of cache files deleted
+        """
+        if (
+            self.cache_dir is None
+            or self.cache_max_age_days is None
+            or not Path(self.cache_dir).is_dir()
+        ):
+            return 0
+        
+        cutoff = time.time() - self.cache_max_age_days * 86400
+        removed = 0
+        for entry in Path(self.cache_dir).glob("*/*"):
+            if entry.suffix not in (".json", ".tmp"):
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    entry.unlink()
+                    removed += 1
+            except OSError as e:
+                logger.warning(f"Failed to remove chunk cache entry {entry}: {e}")
+        
+        if removed:
+            logger.info(f"Pruned {removed} unused chunk cache entries from {self.cache_dir}")
+        return removed
+    
+    def _split_uncached(self, text: str) -> List[str]:
+        """
+        Parse and chunk code with the calling thread's parser.
+        
+        Same as CodeSplitter.split_text, except for the parser it uses.
+        
+        Args:
+            text: The source code text to split
+            
+        Returns:
+            List of code chunks
+            
+        Raises:
+            ValueError: If the code cannot be parsed for the specified language
+        """
+        with self.callback_manager.event(
+            CBEventType.CHUNKING, payload={EventPayload.CHUNKS: [text]}
+        ) as event:
+            text_bytes = bytes(text, "utf-8")
+            tree = self._thread_parser().parse(text_bytes)
+            
+            if not tree.root_node.children or tree.root_node.children[0].type != "ERROR":
+                chunks = [
+                    chunk.strip()
+                    for chunk in self._chunk_node(tree.root_node, text_bytes)
+                ]
+                event.on_end(payload={EventPayload.CHUNKS: chunks})
+                return chunks
+            
+            raise ValueError(f"Could not parse code with language {self.language}.")
+    
+    def _thread_parser(self) -> Any:
+        """
+        Get the tree-sitter parser owned by the calling thread.
+        
+        Returns:
+            tree_sitter.Parser for this splitter's language
+        """
+        parser = getattr(self._local, "parser", None)
+        if parser is None:
+            import tree_sitter
+            
+            parser = tree_sitter.Parser(self._parser.language)
+            self._local.parser = parser
+        return parser
+    
+    def _parse_nodes(
+        self,
+        nodes: Sequence[BaseNode],
+        show_progress: bool = False,
+        **kwargs: Any
+    ) -> List[BaseNode]:
+        """
+        Split documents into nodes, parsing them on the worker pool if enabled.
+        
+        Args:
+            nodes: Documents to split
+            show_progress: Whether to show a progress bar
+            
+        Returns:
+            Chunk nodes, in document order
+        """
+        if self.num_workers < 2 or len(nodes) < 2:
+            return super()._parse_nodes(nodes, show_progress=show_progress, **kwargs)
+        
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.num_workers,
+                thread_name_prefix="code-splitter"
+            )
+        
+        # map() keeps document order, so node order matches the serial path
+        texts = [node.get_content() for node in nodes]
+        splits_iter = get_tqdm_iterable(
+            self._executor.map(self.split_text, texts),
+            show_progress,
+            "Parsing nodes"
+        )
+        
+        all_nodes: List[BaseNode] = []
+        for node, splits in zip(nodes, splits_iter):
+            all_nodes.extend(build_nodes_from_splits(splits, node, id_func=self.id_func))
+        return all_nodes
+    
+    def _cache_path(self, text: str) -> Path:
+        """
+        Get the cache file for a text under the current chunking settings.
+        
+        Args:
+            text: The source code text
+            
+        Returns:
+            Path of the JSON cache entry
+        """
+        hasher = _content_hasher()
+        # Settings are part of the key so changing them never serves stale chunks
+        settings = (
+            f"{CHUNKER_VERSION}\0{self.language}\0{self.chunk_lines}\0"
+            f"{self.chunk_lines_overlap}\0{self.max_chars}\0"
+        )
+        hasher.update(settings.encode("utf-8"))
+        hasher.update(text.encode("utf-8"))
+        digest = hasher.hexdigest()
+        return Path(self.cache_dir) / digest[:2] / f"{digest}.json"
+    
+    def _chunk_spans(self, root: Any, text_bytes: bytes) -> List[Tuple[int, int]]:
+        """
+        Walk the AST without recursion and collect chunk byte spans.
+        
+        Args:
+            root: Root tree-sitter node
+            text_bytes: The original source code text as bytes
+            
+        Returns:
+            List of (start_byte, end_byte) spans, in source order
+        """
+        # CodeSplitter compares a child's byte size with the current chunk's
+        # character count, so the count is kept next to each open span; for
+        # ASCII text (most files) bytes and characters coincide
+        ascii_only = text_bytes.isascii()
+        
+        spans = []
+        # Frame: [children iterator, chunk start (None = empty chunk), last end byte, chunk chars]
+        stack = [[iter(root.children), None, 0, 0]]
+        
+        while stack:
+            frame = stack[-1]
+            child = next(frame[0], None)
+            
+            if child is None:
+                # Node exhausted: flush its open chunk and return to the parent
+                if frame[1] is not None and frame[2] > frame[1]:
+                    spans.append((frame[1], frame[2]))
+                stack.pop()
+                continue
+            
+            child_size = child.end_byte - child.start_byte
+            
+            if child_size > self.max_chars:
+                # Child is too big: flush, then chunk the child's own children
+                if frame[1] is not None and frame[2] > frame[1]:
+                    spans.append((frame[1], frame[2]))
+                stack.append([iter(child.children), None, frame[2], 0])
+                frame[1] = None
+                frame[3] = 0
+            else:
+                # Characters the child adds, including the gap since the last child
+                added = child.end_byte - frame[2]
+                if not ascii_only:
+                    added = len(text_bytes[frame[2]:child.end_byte].decode("utf-8"))
+                
+                if frame[3] + child_size > self.max_chars:
+                    # Child would make the current chunk too big: start a new one
+                    spans.append((frame[1], frame[2]))
+                    frame[1] = frame[2]
+                    frame[3] = added
+                else:
+                    if frame[1] is None:
+                        frame[1] = frame[2]
+                    frame[3] += added
+            
+            frame[2] = child.end_byte
+        
+        return spans
+    
+    def _chunk_node(self, node: Any, text_bytes: bytes, last_end: int = 0) -> List[str]:
+        """
+        Chunk a node into pieces that respect max_chars.
+        
+        Args:
+            node: The AST node to chunk
+            text_bytes: The original source code text as bytes
+            last_end: Unused; kept for CodeSplitter signature compatibility
+            
+        Returns:
+            List of code chunks
+        """
+        return [
+            text_bytes[start:end].decode("utf-8")
+            for start, end in self._chunk_spans(node, text_bytes)
+        ]
@@ -34,6 +34,20 @@ CHUNK_OVERLAP_LINES = 15
 # Maximum characters per chunk (safety limit)
 MAX_CHARS = 2048
 
+# Threads parsing files in parallel during chunking (capped at the CPU count)
+# tree-sitter releases the GIL while parsing, so threads scale across cores
+CODE_SPLIT_MAX_WORKERS = 8
+
+# Directory under STORAGE_PATH caching each file's chunks by content hash
+# (unchanged files are not re-parsed on refresh; None disables the cache,
+# and the directory can be deleted at any time)
+CHUNK_CACHE_DIR = "chunk_cache"
+
+# Chunk cache entries unused (neither read nor written) for this many days are
+# deleted after a successful refresh; age-based so entries of repositories
+# indexed by other refresh calls survive (None keeps every entry)
+CHUNK_CACHE_MAX_AGE_DAYS = 30
+
 # ============================================================================
 # Embedding Model Configuration
 # ============================================================================
@@ -41,6 +55,41 @@ MAX_CHARS = 2048
 # HuggingFace embedding model for vector search
 EMBEDDING_MODEL_NAME = "BAAI/bge-small-en-v1.5"
 
+# Inference backend for the embedding model: "onnx" (ONNX Runtime), "openvino", or "torch"
+# Non-torch backends need optimum (pip install "optimum[onnxruntime]" or "optimum[openvino]")
+# and fall back to PyTorch with a warning when unavailable
+EMBEDDING_BACKEND = "onnx"
+
+# ONNX file inside the model repository (None = the default onnx/model.onnx)
+# e.g. "onnx/model_O4.onnx" for an O4-optimized FP16 export on GPU
+EMBEDDING_ONNX_FILE = None
+
+# Dynamic int8 quantization of the ONNX embedding model (requires optimum):
+# None (disabled), "avx512_vnni", "avx512", "avx2", or "arm64"
+# The quantized export is created once under STORAGE_PATH/EMBEDDING_QUANTIZED_DIR;
+# changing this alters the embeddings, so run refresh_index afterwards
+EMBEDDING_QUANTIZATION = None
+EMBEDDING_QUANTIZED_DIR = "embed_onnx_int8"
+
+# Weight precision for the PyTorch embedding backend: "auto" (FP16 on CUDA, FP32
+# on CPU), "fp16", or "fp32". BF16 is deliberately not offered: on CPUs without
+# AMX it runs several times slower than FP32. ONNX/OpenVINO models keep the
+# precision of their exported file (see EMBEDDING_ONNX_FILE)
+EMBEDDING_PRECISION = "auto"
+
+# Number of texts per embedding forward pass during indexing
+# (LlamaIndex defaults to 10; larger batches keep the CPU/GPU busy per call)
+EMBEDDING_BATCH_SIZE = 64
+
+# Dynamic batching of concurrent query embeddings (requires batched)
+# Queries arriving within the timeout window share one model call
+QUERY_EMBED_BATCH_SIZE = 64
+QUERY_EMBED_BATCH_TIMEOUT_MS = 5.0
+
+# Maximum number of query embeddings kept in memory (0 disables the cache)
+# Agents often repeat a search; a hit skips the embedding forward pass
+QUERY_EMBED_CACHE_SIZE = 1024
+
 # ============================================================================
 # Search Configuration
 # ============================================================================
@@ -56,13 +105,74 @@ BM25_MULTIPLIER = 3
 # Fetch more candidates for fusion (top_k * VECTOR_MULTIPLIER)
 VECTOR_MULTIPLIER = 2
 
+# Share of the dense (vector) ranking in hybrid reciprocal rank fusion
+# The sparse (BM25) ranking gets the rest; 0.5 is plain, unweighted RRF.
+# Raise it for natural-language query traffic; identifier-heavy code queries
+# are where BM25 earns its share
+FUSION_DENSE_WEIGHT = 0.5
+
+# Floor on the candidates each retriever (and the fusion) returns for reranking
+# Keeps a useful cross-encoder pool for small top_k (top_k=3 would otherwise
+# rerank only 6); RERANK_MAX_CANDIDATES still caps what is scored
+MIN_RETRIEVAL_CANDIDATES = 30
+
+# Minimum number of non-stopword query tokens for BM25 to run
+# Queries below this (a lone lowercase word, or only stopwords) use vector search
+# only; any token that looks like a code identifier (a capitalized type name
+# such as Weapon, camelCase, snake_case, digits) always enables BM25
+BM25_MIN_QUERY_TOKENS = 2
+
+# Maximum number of BM25 retrievers kept in memory (one per distinct top_k)
+BM25_CACHE_SIZE = 4
+
+# Directory name prefix for persisted BM25 indexes under STORAGE_PATH
+# Each persisted index lives in STORAGE_PATH/<prefix><collection fingerprint>/
+BM25_PERSIST_PREFIX = "bm25_"
+
+# Score BM25 queries with bm25s's Numba kernels when numba is installed
+# (about 10x faster per query); each cached retriever is compiled in the
+# background and switched over once ready, so no search waits on the JIT.
+# Kernels are cached on disk after the first compile; only long-lived server
+# processes benefit, so verify_rag.py turns this off for its CLI runs
+BM25_NUMBA_SCORING = True
+
 # Reranker model name
 RERANKER_MODEL_NAME = "BAAI/bge-reranker-base"
 
+# Inference backend for the reranker cross-encoder: "onnx", "openvino", or "torch"
+# Same requirements and PyTorch fallback as EMBEDDING_BACKEND
+RERANKER_BACKEND = "onnx"
+
+# ONNX file inside the reranker repository (None = the default onnx/model.onnx)
+# e.g. an FP16 export from `optimum-cli export onnx --dtype fp16` on GPU
+RERANKER_ONNX_FILE = None
+
+# Maximum number of retrieved candidates scored by the cross-encoder
+# Cross-encoder cost grows with the pair count; the fused ranking's tail rarely
+# reaches the final top_k anyway
+RERANK_MAX_CANDIDATES = 50
+
+# Share of the (max-normalized) retrieval score kept in the final reranked score
+# 0.0 ranks by the cross-encoder alone
+RERANK_ALPHA = 0.15
+
+# Maximum number of cached cross-encoder scores, keyed by (query, chunk content)
+# Agents often repeat or rephrase searches; a hit skips the forward pass
+RERANK_SCORE_CACHE_SIZE = 4096
+
+# Prepend each candidate's BM25 score to the cross-encoder query ("[BM25=3.21] query")
+# Only helps a cross-encoder fine-tuned on that input format (BM25CAT); an
+# off-the-shelf reranker has never seen the prefix, so it stays off by default
+RERANK_BM25_IN_INPUT = False
+
 # Number of final results after reranking
 # Should typically match or be less than top_k
 RERANK_TOP_N_RATIO = 1.0  # Multiplier for top_k
 
+# Load the reranker and run both models once in the background at server start,
+# so the first search skips weight loading and (on GPU) device initialization
+WARMUP_MODELS = True
+
 # ============================================================================
 # File Filtering Configuration
 # ============================================================================
@@ -78,12 +188,45 @@ GENERATED_MARKERS = [
     "<auto-generated>",
     "This code was generated",
     "// <auto-generated />",
+    "<auto-generated/>",  # compact form emitted by Roslyn source generators
     "Auto-generated code"
 ]
 
 # Number of characters to check in file header for generated markers
 HEADER_CHECK_CHARS = 1000
 
+# Gitignore-style pattern files honoured per directory while scanning
+# (requires pathspec; ignored with a warning when it is not installed)
+IGNORE_FILE_NAMES = (".gitignore", ".mutagenignore")
+
+# Minimum batch size before C# metadata extraction runs on the refresh's process pool
+# (only refreshes large enough for the file-loading pool below have one)
+PARALLEL_METADATA_MIN_DOCS = 1000
+
+# Minimum file count per refresh before files are read by a persistent process pool
+# The pool is started once per refresh, so it only pays off on large repositories
+PARALLEL_LOAD_MIN_FILES = 10000
+
+# Upper bound on file-loading worker processes (each is a copy of the server process)
+PARALLEL_LOAD_MAX_WORKERS = 8
+
+# ============================================================================
+# Near-Duplicate Detection Configuration
+# ============================================================================
+
+# Drop near-duplicate documents before embedding (requires datasketch); off by
+# default, since a dropped copy can no longer be found under its own path
+DEDUP_ENABLED = False
+
+# Estimated Jaccard similarity above which a document counts as a duplicate
+DEDUP_THRESHOLD = 0.9
+
+# Number of MinHash permutations (higher = more accurate, slower)
+DEDUP_NUM_PERM = 64
+
+# Number of consecutive tokens per shingle
+DEDUP_SHINGLE_SIZE = 5
+
 # ============================================================================
 # Metadata Extraction Configuration
 # ============================================================================
@@ -104,6 +247,13 @@ MAX_BATCH_SIZE = 5000
 # Batch size divisor for safety margin
 BATCH_SIZE_DIVISOR = 2
 
+# Number of embedded batches that may wait for the ChromaDB writer thread
+# Bounds memory while letting embedding run ahead of inserts
+INSERT_QUEUE_SIZE = 2
+
+# Page size when reading documents back out of ChromaDB (e.g., for BM25)
+CHROMA_FETCH_PAGE_SIZE = 5000
+
 # ============================================================================
 # Logging Configuration
 # ============================================================================
@@ -0,0 +1,131 @@
+"""
+Near-duplicate detection module for Mutagen RAG system.
+Drops documents that are near-identical to one already kept, before embedding.
+"""
+from typing import List, Optional
+
+from config import DEDUP_ENABLED, DEDUP_THRESHOLD, DEDUP_NUM_PERM, DEDUP_SHINGLE_SIZE
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# MinHash LSH is optional; without it deduplication is skipped
+try:
+    from datasketch import MinHash, MinHashLSH
+except ImportError:
+    MinHash = None
+    MinHashLSH = None
+
+
+class NearDuplicateFilter:
+    """
+    Filters near-duplicate documents using MinHash locality-sensitive hashing.
+    
+    Keeps the first document of each near-duplicate group. State persists across
+    calls, so one instance deduplicates a whole refresh processed in batches.
+    """
+    
+    def __init__(
+        self,
+        enabled: bool = None,
+        threshold: float = None,
+        num_perm: int = None,
+        shingle_size: int = None
+    ):
+        """
+        Initialize the near-duplicate filter.
+        
+        Args:
+            enabled: Whether to filter at all (defaults to DEDUP_ENABLED)
+            threshold: Estimated Jaccard similarity above which documents are duplicates
+            num_perm: Number of MinHash permutations
+            shingle_size: Number of consecutive tokens per shingle
+        """
+        self.threshold = threshold or DEDUP_THRESHOLD
+        self.num_perm = num_perm or DEDUP_NUM_PERM
+        self.shingle_size = shingle_size or DEDUP_SHINGLE_SIZE
+        
+        self._lsh: Optional["MinHashLSH"] = None
+        if enabled is None:
+            enabled = DEDUP_ENABLED
+        if enabled and MinHashLSH is not None:
+            self._lsh = MinHashLSH(threshold=self.threshold, num_perm=self.num_perm)
+        elif enabled:
+            logger.warning("datasketch not available. Near-duplicate filtering disabled.")
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether MinHash deduplication is enabled and available."""
+        return self._lsh is not None
+    
+    def _minhash(self, text: str) -> "MinHash":
+        """
+        Build a MinHash signature from token shingles of the text.
+        
+        Args:
+            text: Document content
+            
+        Returns:
+            MinHash signature
+        """
+        tokens = text.split()
+        n = self.shingle_size
+        if len(tokens) <= n:
+            shingles = {" ".join(tokens)}
+        else:
+            shingles = {" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1)}
+        
+        signature = MinHash(num_perm=self.num_perm)
+        signature.update_batch(s.encode("utf-8") for s in shingles)
+        return signature
+    
+    def filter_documents(self, documents: List) -> List:
+        """
+        Drop documents that are near-duplicates of previously seen ones.
+        
+        A kept document from the same call gets metadata["duplicates"] listing
+        the file paths of the copies dropped in its favor (not embedded), so
+        search results still point at them. Copies of a document indexed by an
+        earlier call can only be logged, since it is already written.
+        
+        Args:
+            documents: List of LlamaIndex Document objects
+            
+        Returns:
+            Documents that are not near-duplicates of any earlier document
+        """
+        if not self.enabled:
+            return documents
+        
+        kept_docs = []
+        kept_by_id = {}
+        for doc in documents:
+            signature = self._minhash(doc.text)
+            matches = self._lsh.query(signature)
+            if matches:
+                source = doc.metadata.get("file_path", doc.id_)
+                original = kept_by_id.get(matches[0])
+                if original is None:
+                    logger.info(f"Dropped {source}: near-duplicate of already indexed {matches[0]}")
+                    continue
+                
+                duplicates = original.metadata.get("duplicates")
+                original.metadata["duplicates"] = f"{duplicates}, {source}" if duplicates else source
+                if "duplicates" not in original.excluded_embed_metadata_keys:
+                    original.excluded_embed_metadata_keys.append("duplicates")
+                continue
+            
+            # Duplicate IDs would make MinHashLSH.insert raise
+            if doc.id_ not in self._lsh:
+                self._lsh.insert(doc.id_, signature)
+                kept_by_id[doc.id_] = doc
+            kept_docs.append(doc)
+        
+        removed = len(documents) - len(kept_docs)
+        if removed:
+            logger.info(
+                f"Dropped {removed}/{len(documents)} near-duplicate documents "
+                f"({removed / len(documents):.1%})"
+            )
+        
+        return kept_docs
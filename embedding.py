@@ -0,0 +1,195 @@
+"""
+Embedding model module for Mutagen RAG system.
+Coalesces concurrent query embeddings into shared model calls.
+"""
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, List, Tuple
+
+import numpy as np
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
+from config import (
+    EMBEDDING_PRECISION,
+    QUERY_EMBED_BATCH_SIZE,
+    QUERY_EMBED_BATCH_TIMEOUT_MS,
+    QUERY_EMBED_CACHE_SIZE
+)
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# batched is optional; without it each query is embedded on its own
+try:
+    import batched
+except ImportError:
+    batched = None
+
+
+def prepare_quantized_model(model_name: str, quantization: str, cache_dir: str) -> Tuple[str, str]:
+    """
+    Export a dynamically int8-quantized ONNX copy of an embedding model, once.
+    
+    The model is saved under cache_dir/<model name> together with its quantized
+    ONNX file; later calls find the file and skip the export.
+    
+    Args:
+        model_name: HuggingFace model name to quantize
+        quantization: Quantization target ("avx512_vnni", "avx512", "avx2", "arm64")
+        cache_dir: Directory holding quantized model copies
+        
+    Returns:
+        Tuple of (local model path, ONNX file name within it)
+        
+    Raises:
+        ImportError: If sentence-transformers or optimum is not installed
+    """
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+    
+    model_dir = Path(cache_dir) / model_name.replace("/", "__")
+    file_name = f"onnx/model_qint8_{quantization}.onnx"
+    if not (model_dir / file_name).is_file():
+        logger.info(f"Exporting {quantization} int8 ONNX model for {model_name} to {model_dir}")
+        model = SentenceTransformer(model_name, backend="onnx")
+        model.save(str(model_dir))
+        export_dynamic_quantized_onnx_model(model, quantization, str(model_dir))
+    
+    return str(model_dir), file_name
+
+
+class DynamicBatchingEmbedding(HuggingFaceEmbedding):
+    """
+    HuggingFaceEmbedding whose query embeddings are dynamically batched.
+    
+    Concurrent searches each embed a single query. A background batcher
+    collects queries arriving within a short window into one encode call.
+    Document embeddings are already batched by IndexManager and bypass it.
+    Embeddings of recent queries are kept in an LRU cache, so a repeated
+    query skips the model entirely.
+    """
+    
+    _query_batcher: Any = PrivateAttr(default=None)
+    _query_cache: "OrderedDict[str, List[float]]" = PrivateAttr(default_factory=OrderedDict)
+    _query_cache_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _query_cache_size: int = PrivateAttr(default=0)
+    
+    def __init__(
+        self,
+        query_batch_size: int = None,
+        query_batch_timeout_ms: float = None,
+        precision: str = None,
+        query_cache_size: int = None,
+        **kwargs: Any
+    ):
+        """
+        Initialize the embedding model and its query batcher.
+        
+        Args:
+            query_batch_size: Maximum number of queries per coalesced call
+            query_batch_timeout_ms: How long to wait for more queries before encoding
+            precision: "auto", "fp16", or "fp32" (default: EMBEDDING_PRECISION)
+            query_cache_size: Maximum number of cached query embeddings (0 = no cache)
+            **kwargs: Passed through to HuggingFaceEmbedding
+        """
+        super().__init__(**kwargs)
+        self._apply_precision(precision or EMBEDDING_PRECISION)
+        self._query_cache_size = (
+            QUERY_EMBED_CACHE_SIZE if query_cache_size is None else query_cache_size
+        )
+        
+        if batched is not None:
+            timeout_ms = query_batch_timeout_ms
+            if timeout_ms is None:
+                timeout_ms = QUERY_EMBED_BATCH_TIMEOUT_MS
+            self._query_batcher = batched.dynamically(
+                self._embed_queries,
+                batch_size=query_batch_size or QUERY_EMBED_BATCH_SIZE,
+                timeout_ms=timeout_ms
+            )
+        else:
+            logger.warning("batched not available. Query embeddings will not be dynamically batched.")
+    
+    @classmethod
+    def class_name(cls) -> str:
+        return "DynamicBatchingEmbedding"
+    
+    def _apply_precision(self, precision: str) -> None:
+        """
+        Cast a PyTorch model to FP16 when requested or when running on CUDA.
+        
+        Args:
+            precision: "auto", "fp16", or "fp32"
+        """
+        # ONNX/OpenVINO models run at the precision they were exported with
+        if getattr(self._model, "backend", "torch") != "torch":
+            return
+        
+        on_cuda = str(self._device).startswith("cuda")
+        if precision == "fp16" or (precision == "auto" and on_cuda):
+            self._model.half()
+            logger.info(f"Embedding model cast to FP16 on {self._device}")
+    
+    def get_text_embedding_array(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed documents into one contiguous (N, dim) float32 array.
+        
+        HuggingFaceEmbedding converts the encoder's array to nested lists,
+        which ChromaDB then converts back; writing the array directly skips
+        both copies.
+        
+        Args:
+            texts: Document texts
+        
+        Returns:
+            Array with one embedding row per text
+        """
+        return self._model.encode(
+            texts,
+            batch_size=self.embed_batch_size,
+            prompt_name="text",
+            normalize_embeddings=self.normalize,
+            show_progress_bar=self.show_progress_bar,
+            convert_to_numpy=True
+        )
+    
+    def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """
+        Embed a coalesced batch of queries in one model call.
+        
+        Args:
+            queries: Query strings gathered by the batcher
+        
+        Returns:
+            One embedding per query, in order
+        """
+        return self._embed(queries, prompt_name="query")
+    
+    def _get_query_embedding(self, query: str) -> List[float]:
+        """
+        Embed a single query, sharing the model call with concurrent queries.
+        
+        Args:
+            query: Query text
+        
+        Returns:
+            Query embedding (cached embeddings are returned as-is)
+        """
+        with self._query_cache_lock:
+            embedding = self._query_cache.get(query)
+            if embedding is not None:
+                self._query_cache.move_to_end(query)
+                return embedding
+        
+        if self._query_batcher is None:
+            embedding = super()._get_query_embedding(query)
+        else:
+            embedding = self._query_batcher(query)
+        
+        if self._query_cache_size > 0:
+            with self._query_cache_lock:
+                self._query_cache[query] = embedding
+                while len(self._query_cache) > self._query_cache_size:
+                    self._query_cache.popitem(last=False)
+        return embedding
@@ -4,18 +4,67 @@ Handles filtering of generated files and directory scanning.
 """
 import os
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterator, List, Tuple, Union
 
 from config import (
     GENERATED_SUFFIXES,
     EXCLUDED_DIRS,
     GENERATED_MARKERS,
-    HEADER_CHECK_CHARS
+    HEADER_CHECK_CHARS,
+    IGNORE_FILE_NAMES
 )
 from logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# pathspec is optional; without it ignore files are not applied
+try:
+    import pathspec
+except ImportError:
+    pathspec = None
+
+
+def _common_substring(markers: List[str]) -> str:
+    """
+    Find the longest substring shared by every marker.
+    
+    Args:
+        markers: Generated-file markers
+        
+    Returns:
+        Longest common substring, or "" if the markers share none
+    """
+    if not markers:
+        return ""
+    
+    shortest = min(markers, key=len)
+    for length in range(len(shortest), 0, -1):
+        for start in range(len(shortest) - length + 1):
+            candidate = shortest[start:start + length]
+            if all(candidate in marker for marker in markers):
+                return candidate
+    return ""
+
+
+def _header_has_marker(
+    markers: tuple,
+    header: Union[str, bytes],
+    anchor: Union[str, bytes] = ""
+) -> bool:
+    """
+    Check a pre-sliced file header for generated markers.
+    Works on decoded text or raw bytes (with byte-encoded markers).
+    
+    The anchor is a substring every marker contains: one scan for it rejects
+    nearly all handwritten headers before the per-marker loop.
+    """
+    if anchor and anchor not in header:
+        return False
+    for marker in markers:
+        if marker in header:
+            return True
+    return False
+
 
 class FileFilterer:
     """
@@ -31,7 +80,8 @@ class FileFilterer:
         generated_suffixes: List[str] = None,
         excluded_dirs: set = None,
         generated_markers: List[str] = None,
-        header_check_chars: int = None
+        header_check_chars: int = None,
+        ignore_file_names: Tuple[str, ...] = None
     ):
         """
         Initialize the file filterer with configurable parameters.
@@ -41,11 +91,30 @@ class FileFilterer:
             excluded_dirs: Directory names to exclude from scanning
             generated_markers: Content markers indicating auto-generated files
             header_check_chars: Number of characters to check in file header
+            ignore_file_names: Gitignore-style pattern files applied while scanning
         """
         self.generated_suffixes = generated_suffixes or GENERATED_SUFFIXES
         self.excluded_dirs = excluded_dirs or EXCLUDED_DIRS
         self.generated_markers = generated_markers or GENERATED_MARKERS
         self.header_check_chars = header_check_chars or HEADER_CHECK_CHARS
+        self.ignore_file_names = ignore_file_names if ignore_file_names is not None else IGNORE_FILE_NAMES
+        
+        if pathspec is None and self.ignore_file_names:
+            logger.warning("pathspec not available. Ignore files will not be applied.")
+        
+        # Tuple form lets str.endswith test all suffixes in a single C-level call
+        self._suffix_tuple = tuple(self.generated_suffixes)
+        
+        # A handful of short markers: plain substring search on the header
+        # beats both a regex alternation and an Aho-Corasick automaton
+        self._marker_tuple = tuple(self.generated_markers)
+        
+        # Encoded markers for scanning raw file bytes before decoding
+        self._marker_bytes = tuple(marker.encode("utf-8") for marker in self.generated_markers)
+        
+        # Substring all markers share (e.g. "generated"), used as a cheap precheck
+        self._marker_anchor = _common_substring(self.generated_markers)
+        self._marker_anchor_bytes = self._marker_anchor.encode("utf-8")
     
     def is_generated_file_fast(self, file_path: Path) -> bool:
         """
@@ -61,7 +130,7 @@ class FileFilterer:
         path_str = str(file_path)
         
         # 1. Check file name patterns
-        if any(path_str.endswith(suffix) for suffix in self.generated_suffixes):
+        if path_str.endswith(self._suffix_tuple):
             return True
         
         # 2. Check directory names
@@ -82,8 +151,128 @@ class FileFilterer:
             True if the file content indicates it's auto-generated, False otherwise
         """
         # Only check first N chars for performance
-        header = text[:self.header_check_chars]
-        return any(marker in header for marker in self.generated_markers)
+        return _header_has_marker(
+            self._marker_tuple,
+            text[:self.header_check_chars],
+            self._marker_anchor
+        )
+    
+    def _load_ignore_spec(self, directory: str, names: set):
+        """
+        Compile the ignore files present in a directory into one spec.
+        
+        Args:
+            directory: Directory containing the ignore files
+            names: Entry names already read from the directory
+            
+        Returns:
+            Compiled GitIgnoreSpec, or None if no usable patterns were found
+        """
+        lines = []
+        for ignore_name in self.ignore_file_names:
+            if ignore_name not in names:
+                continue
+            ignore_path = os.path.join(directory, ignore_name)
+            try:
+                with open(ignore_path, encoding="utf-8", errors="replace") as f:
+                    lines.extend(f.read().splitlines())
+            except OSError as e:
+                logger.warning(f"Cannot read ignore file {ignore_path}: {e}")
+        
+        if not lines:
+            return None
+        
+        try:
+            return pathspec.GitIgnoreSpec.from_lines(lines)
+        except ValueError as e:
+            logger.warning(f"Invalid pattern in ignore files under {directory}: {e}")
+            return None
+    
+    def _iter_source_entries(self, repo_path: Path, extension: str) -> Iterator[os.DirEntry]:
+        """
+        Walk the repository and yield entries for files that pass the fast filter.
+        
+        Uses an explicit os.scandir stack: DirEntry carries the file type from
+        the directory read, so no extra stat() or Path allocation per entry.
+        Ignore files found along the way apply to their directory and below,
+        with paths matched relative to the directory that holds them.
+        
+        Args:
+            repo_path: Path to the repository root
+            extension: File extension to filter
+            
+        Yields:
+            DirEntry objects for non-generated files with the given extension
+        """
+        use_ignore_files = pathspec is not None and bool(self.ignore_file_names)
+        
+        # Each stack item carries the (base dir prefix, spec) pairs inherited from parents
+        stack: List[Tuple[str, tuple]] = [(str(repo_path), ())]
+        
+        while stack:
+            current_dir, specs = stack.pop()
+            try:
+                with os.scandir(current_dir) as it:
+                    entries = list(it)
+            except OSError as e:
+                logger.warning(f"Cannot scan directory {current_dir}: {e}")
+                continue
+            
+            if use_ignore_files:
+                spec = self._load_ignore_spec(current_dir, {entry.name for entry in entries})
+                if spec is not None:
+                    specs = specs + ((os.path.join(current_dir, ""), spec),)
+            
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                
+                if is_dir:
+                    # Pruning here guarantees no excluded directory
+                    # appears in any collected path
+                    if entry.name in self.excluded_dirs:
+                        continue
+                    if specs and self._is_ignored(entry.path, specs, is_dir=True):
+                        continue
+                    stack.append((entry.path, specs))
+                elif entry.name.endswith(extension):
+                    # Fast path-based filtering (no file I/O)
+                    if entry.name.endswith(self._suffix_tuple):
+                        continue
+                    if specs and self._is_ignored(entry.path, specs, is_dir=False):
+                        continue
+                    yield entry
+    
+    @staticmethod
+    def _is_ignored(path: str, specs: tuple, is_dir: bool) -> bool:
+        """
+        Check a path against the ignore specs inherited by its directory.
+        
+        As in git, the last matching pattern wins across files too: specs are
+        checked innermost first, and the first one with any matching pattern
+        (ignore or negation) decides, so a nested "!Keep.cs" re-includes a
+        file a parent ignore file excluded.
+        
+        Args:
+            path: Full path of the entry
+            specs: (base dir prefix, spec) pairs, outermost first
+            is_dir: Whether the entry is a directory
+            
+        Returns:
+            True if the deciding spec ignores the path, False otherwise
+        """
+        for base, spec in reversed(specs):
+            relative = path[len(base):]
+            if os.sep != "/":
+                relative = relative.replace(os.sep, "/")
+            if is_dir:
+                relative += "/"
+            include = spec.check_file(relative).include
+            if include is not None:
+                return include
+        return False
     
     def scan_files(self, repo_path: Path, extension: str = ".cs") -> List[str]:
         """
@@ -103,30 +292,81 @@ class FileFilterer:
             logger.error(f"Repository path does not exist: {repo_path}")
             return []
         
-        all_files = []
-        
-        for root, dirs, files in os.walk(str(repo_path)):
-            # Modify dirs in-place to skip excluded directories
-            # This prevents os.walk from descending into them
-            dirs[:] = [d for d in dirs if d not in self.excluded_dirs]
-            
-            for file in files:
-                if file.endswith(extension):
-                    full_path = Path(root) / file
-                    
-                    # Fast path-based filtering (no file I/O)
-                    if not self.is_generated_file_fast(full_path):
-                        all_files.append(str(full_path))
+        all_files = [entry.path for entry in self._iter_source_entries(repo_path, extension)]
         
         logger.info(f"Pre-filtered to {len(all_files)} {extension} files before loading")
         return all_files
     
+    def scan_files_with_mtimes(self, repo_path: Path, extension: str = ".cs") -> Dict[str, float]:
+        """
+        Scan repository like scan_files, also capturing each file's mtime.
+        
+        The mtime comes from DirEntry.stat(), which is cached on the entry
+        (and free on Windows), so metadata assignment needs no second stat().
+        
+        Args:
+            repo_path: Path to the repository root
+            extension: File extension to filter (default: ".cs")
+            
+        Returns:
+            Dictionary mapping file paths (as strings) to modification times, in scan order
+        """
+        if not repo_path.exists():
+            logger.error(f"Repository path does not exist: {repo_path}")
+            return {}
+        
+        mtimes = {
+            entry.path: entry.stat().st_mtime
+            for entry in self._iter_source_entries(repo_path, extension)
+        }
+        
+        logger.info(f"Pre-filtered to {len(mtimes)} {extension} files before loading")
+        return mtimes
+    
+    def prefilter_by_header_raw(self, file_paths: List[str]) -> List[str]:
+        """
+        Drop files whose raw header bytes contain a generated marker.
+        
+        Reads at most header_check_chars bytes per file and never decodes
+        them, so generated files are excluded before document loading.
+        Every UTF-8 byte is at most one character, so a match here is also a
+        match for is_header_generated; files it misses (e.g. UTF-16) are
+        still caught by filter_documents_by_content after loading.
+        
+        Args:
+            file_paths: File paths that already passed the fast filter
+            
+        Returns:
+            File paths whose headers contain no generated marker
+        """
+        surviving_paths = []
+        for file_path in file_paths:
+            try:
+                with open(file_path, "rb") as f:
+                    head = f.read(self.header_check_chars)
+            except OSError as e:
+                # Leave unreadable files to the loader, which reports them
+                logger.warning(f"Cannot read header of {file_path}: {e}")
+                surviving_paths.append(file_path)
+                continue
+            
+            if not _header_has_marker(self._marker_bytes, head, self._marker_anchor_bytes):
+                surviving_paths.append(file_path)
+        
+        excluded_count = len(file_paths) - len(surviving_paths)
+        if excluded_count:
+            logger.info(f"Excluded {excluded_count} files with generated headers before loading")
+        
+        return surviving_paths
+    
     def filter_documents_by_content(self, documents: List) -> List:
         """
         Filter documents by checking their content for generated markers.
         
         This is the second-stage filtering that reads file content.
         Should only be called on documents that already passed the fast filter.
+        Runs in-process: a substring check per header is far cheaper than
+        pickling headers to worker processes.
         
         Args:
             documents: List of LlamaIndex Document objects
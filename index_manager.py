@@ -2,32 +2,138 @@
 Index management module for Mutagen RAG system.
 Handles vector index creation, updating, and persistence.
 """
+import contextlib
+import functools
+import multiprocessing
+import os
+import queue
+import re
+import shutil
+import threading
 import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple, Union
 
 from llama_index.core import (
+    Settings,
     SimpleDirectoryReader,
     VectorStoreIndex,
     StorageContext,
 )
-from llama_index.core.schema import Document
+from llama_index.core.ingestion import run_transformations
+from llama_index.core.schema import Document, MetadataMode
+from llama_index.core.vector_stores.utils import node_to_metadata_dict
 from llama_index.vector_stores.chroma import ChromaVectorStore
 import chromadb
+from chromadb import errors as chroma_errors
 
 from config import (
     STORAGE_PATH,
     COLLECTION_NAME,
+    BM25_PERSIST_PREFIX,
     DEFAULT_BATCH_SIZE,
     MAX_BATCH_SIZE,
-    BATCH_SIZE_DIVISOR
+    BATCH_SIZE_DIVISOR,
+    INSERT_QUEUE_SIZE,
+    PARALLEL_METADATA_MIN_DOCS,
+    PARALLEL_LOAD_MIN_FILES,
+    PARALLEL_LOAD_MAX_WORKERS
 )
+from dedup import NearDuplicateFilter
 from file_filters import FileFilterer
 from metadata_extractor import MetadataExtractor
 from logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# Separators accepted between repository paths (comma and/or newline)
+_PATH_SEPARATOR_RE = re.compile(r"[,\n]+")
+
+# Errors ChromaDB raises when it rejects the records themselves (invalid
+# metadata, an oversized batch); anything else, such as a locked database or a
+# full disk, fails every record alike and is re-raised instead of retried
+_RECORD_REJECTION_ERRORS = tuple(
+    error for error in (
+        ValueError,
+        TypeError,
+        getattr(chroma_errors, "InvalidArgumentError", None),
+        getattr(chroma_errors, "BatchSizeExceededError", None),
+    )
+    if error is not None
+)
+
+
+def _parse_paths(repo_paths: Union[str, List[str]]) -> List[str]:
+    """
+    Split repository path input into a list of non-empty paths.
+    
+    Args:
+        repo_paths: Comma/newline separated string, or a list of paths
+        
+    Returns:
+        Stripped, non-empty paths in input order
+    """
+    # List entries are taken whole, so a path containing a comma survives
+    parts = repo_paths if isinstance(repo_paths, list) else _PATH_SEPARATOR_RE.split(repo_paths)
+    return [path for path in map(str.strip, parts) if path]
+
+
+def _extract_worker(extractor: MetadataExtractor, payload: Tuple[str, str]) -> Dict[str, str]:
+    """
+    Extract C# metadata for one (file_path, text) pair, or {} if extraction fails.
+    Module-level so it can be pickled to worker processes; a bad file must not
+    raise out of executor.map and abort the whole refresh.
+    """
+    file_path, text = payload
+    try:
+        return extractor.extract_all(file_path, text)
+    except Exception as e:
+        logger.warning(f"Failed to extract metadata for {file_path}: {e}")
+        return {}
+
+
+@functools.lru_cache(maxsize=16)
+def _resolved(path: str) -> Path:
+    """Canonicalize a repository path; memoized because paths_list is tiny."""
+    return Path(path).resolve()
+
+
+@functools.lru_cache(maxsize=4096)
+def _resolved_dir(directory: str) -> str:
+    """Canonicalize a directory path; memoized because many files share one."""
+    return str(Path(directory).resolve())
+
+
+def _pool_context():
+    """
+    Start method for refresh process pools: forkserver where available, else spawn.
+    
+    Refreshes run on a worker thread while the ChromaDB writer, model warmup,
+    and query batcher threads are alive; forking such a process can hand the
+    workers locks that no thread will ever release.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        # Import this module (and llama_index) once in the fork server rather
+        # than in every worker it forks; the fork server resolves it from the
+        # working directory, as under `uv run --directory <repo> server.py`
+        context.set_forkserver_preload(["__main__", __name__])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+@functools.lru_cache(maxsize=4)
+def _client_max_batch_size(chroma_client) -> int:
+    """Query a client's max batch size once; it is fixed for the client's lifetime."""
+    get_max_batch_size = getattr(chroma_client, "get_max_batch_size", None)
+    if get_max_batch_size is not None:
+        return int(get_max_batch_size())
+    # Older clients expose the limit as an attribute
+    return int(getattr(chroma_client, "max_batch_size", MAX_BATCH_SIZE))
+
 
 class IndexManager:
     """
@@ -69,9 +175,16 @@ class IndexManager:
         self.file_filterer = FileFilterer()
         self.metadata_extractor = MetadataExtractor()
         
+        # Collection handle, created on the first build and reused afterwards
+        self._collection = None
+        
         # Calculate safe batch size for ChromaDB
         self.batch_size = self._calculate_batch_size()
         
+        # Direct upserts can use the client's full limit: each call is one
+        # SQLite transaction, so fewer, larger calls mean fewer commits
+        self.upsert_batch_size = self._calculate_upsert_batch_size()
+        
         logger.info(f"IndexManager initialized with batch size: {self.batch_size}")
     
     def _calculate_batch_size(self) -> int:
@@ -82,7 +195,7 @@ class IndexManager:
             Safe batch size integer
         """
         try:
-            max_batch = getattr(self.chroma_client, "max_batch_size", MAX_BATCH_SIZE)
+            max_batch = _client_max_batch_size(self.chroma_client)
             safe_batch = min(MAX_BATCH_SIZE, max_batch // BATCH_SIZE_DIVISOR)
             logger.info(f"ChromaDB max_batch_size: {max_batch}, using: {safe_batch}")
             return safe_batch
@@ -90,6 +203,19 @@ class IndexManager:
             logger.warning(f"Failed to get max_batch_size: {e}. Using fallback: {DEFAULT_BATCH_SIZE}")
             return DEFAULT_BATCH_SIZE
     
+    def _calculate_upsert_batch_size(self) -> int:
+        """
+        Get the largest record count ChromaDB accepts in a single upsert.
+        
+        Returns:
+            The client's max batch size, or the safe batch size if unavailable
+        """
+        try:
+            return max(self.batch_size, _client_max_batch_size(self.chroma_client))
+        except Exception as e:
+            logger.warning(f"Failed to get max upsert size: {e}. Using batch size: {self.batch_size}")
+            return self.batch_size
+    
     def scan_and_filter_files(self, repo_path: str) -> List[str]:
         """
         Scan repository and return filtered file paths.
@@ -118,12 +244,17 @@ class IndexManager:
         
         return all_files
     
-    def load_documents(self, file_paths: List[str]) -> List[Document]:
+    def load_documents(
+        self,
+        file_paths: List[str],
+        executor: Optional[Executor] = None
+    ) -> List[Document]:
         """
         Load documents from file paths.
         
         Args:
             file_paths: List of file paths to load
+            executor: Optional process pool to read the files in (see _loader_pool)
             
         Returns:
             List of loaded Document objects
@@ -137,17 +268,79 @@ class IndexManager:
         )
         
         try:
-            all_docs = reader.load_data()
+            if executor is None:
+                all_docs = reader.load_data()
+            else:
+                all_docs = self._load_data_parallel(reader, executor)
             logger.info(f"Loaded {len(all_docs)} documents")
         except Exception as e:
             raise RuntimeError(f"Error loading data: {e}")
         
         return all_docs
     
+    def _load_data_parallel(
+        self,
+        reader: SimpleDirectoryReader,
+        executor: Executor
+    ) -> List[Document]:
+        """
+        Read a reader's input files in an existing process pool.
+        
+        SimpleDirectoryReader.load_data(num_workers=...) starts a fresh spawn
+        pool on every call, which costs seconds per streaming batch. This does
+        the same per-file work in a pool that lives for the whole refresh.
+        
+        Args:
+            reader: Reader configured with the files to load
+            executor: Process pool to read the files in
+            
+        Returns:
+            List of loaded Document objects, in file order
+        """
+        load_file = partial(
+            SimpleDirectoryReader.load_file,
+            file_metadata=reader.file_metadata,
+            file_extractor=reader.file_extractor,
+            filename_as_id=reader.filename_as_id,
+            encoding=reader.encoding,
+            errors=reader.errors,
+            raise_on_error=reader.raise_on_error,
+            fs=reader.fs
+        )
+        
+        chunksize = max(1, len(reader.input_files) // (PARALLEL_LOAD_MAX_WORKERS * 4))
+        documents = [
+            doc
+            for docs in executor.map(load_file, reader.input_files, chunksize=chunksize)
+            for doc in docs
+        ]
+        # Same metadata exclusions load_data applies before returning
+        return reader._exclude_metadata(documents)
+    
+    def _loader_pool(self, num_files: int):
+        """
+        Create the file-loading pool for a refresh, if it is large enough to pay off.
+        
+        The same pool also runs C# metadata extraction for the refresh.
+        
+        Args:
+            num_files: Number of files the refresh will load
+            
+        Returns:
+            Context manager yielding a ProcessPoolExecutor, or None for serial loading
+        """
+        workers = min(PARALLEL_LOAD_MAX_WORKERS, os.cpu_count() or 1)
+        if num_files < PARALLEL_LOAD_MIN_FILES or workers < 2:
+            return contextlib.nullcontext()
+        
+        logger.info(f"Loading files with {workers} worker processes")
+        return ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context())
+    
     def filter_and_add_metadata(
         self,
         documents: List[Document],
-        paths_list: List[str] = None
+        paths_list: List[str] = None,
+        mtimes: Dict[str, float] = None
     ) -> List[Document]:
         """
         Filter documents by content and add metadata (including source_repo).
@@ -155,6 +348,7 @@ class IndexManager:
         Args:
             documents: List of Document objects
             paths_list: Optional list of repository paths (for source_repo metadata)
+            mtimes: Optional file path -> mtime mapping captured during scanning
             
         Returns:
             List of filtered documents with metadata
@@ -170,69 +364,429 @@ class IndexManager:
         if not filtered_docs:
             raise ValueError("No documents remained after filtering. Check path and filter logic.")
         
-        # Add metadata to each document
-        for doc in filtered_docs:
-            file_path = Path(doc.metadata["file_path"])
+        return self.add_metadata(filtered_docs, paths_list, mtimes)
+    
+    def add_metadata(
+        self,
+        documents: List[Document],
+        paths_list: List[str] = None,
+        mtimes: Dict[str, float] = None,
+        executor: Optional[Executor] = None
+    ) -> List[Document]:
+        """
+        Add source, source_repo, and C# metadata to already-filtered documents.
+        
+        Args:
+            documents: List of Document objects that passed content filtering
+            paths_list: Optional list of repository paths (for source_repo metadata)
+            mtimes: Optional file path -> mtime mapping captured during scanning;
+                    files missing from it fall back to a stat() call
+            executor: Optional process pool for C# metadata extraction (see _loader_pool)
+            
+        Returns:
+            The same documents with metadata populated
+        """
+        mtimes = mtimes or {}
+        
+        # Resolve repository roots once; documents are then classified by
+        # plain string prefix instead of a relative_to() try/except per pair
+        repo_prefixes = []
+        for repo_path in paths_list or []:
+            repo_path_resolved = _resolved(repo_path)
+            prefix = os.path.normcase(os.path.join(str(repo_path_resolved), ""))
+            repo_prefixes.append((prefix, repo_path_resolved.name))
+        # Longest prefix first, so a file in a nested repository is attributed
+        # to the innermost one whatever order the paths were given in
+        repo_prefixes.sort(key=lambda item: len(item[0]), reverse=True)
+        
+        for doc in documents:
+            # Plain string paths: no Path object is built per document
+            file_path = doc.metadata["file_path"]
             
             # Determine source repository if paths_list is provided
             doc.metadata["source_repo"] = "unknown"
-            if paths_list:
-                for repo_path in paths_list:
-                    repo_path_resolved = Path(repo_path).resolve()
-                    try:
-                        file_path.resolve().relative_to(repo_path_resolved)
-                        doc.metadata["source_repo"] = repo_path_resolved.name
+            if repo_prefixes:
+                # Resolve the parent directory (cached) instead of every file
+                directory, file_name = os.path.split(file_path)
+                abs_path = os.path.normcase(
+                    os.path.join(_resolved_dir(directory or "."), file_name)
+                )
+                for prefix, repo_name in repo_prefixes:
+                    if abs_path.startswith(prefix):
+                        doc.metadata["source_repo"] = repo_name
                         break
-                    except ValueError:
-                        continue
             
             # Basic metadata
             doc.metadata["source"] = "mutagen_handwritten"
-            doc.metadata["indexed_at"] = str(file_path.stat().st_mtime)
-            
-            # Extract C# metadata
-            try:
-                csharp_metadata = self.metadata_extractor.extract_all(
-                    doc.metadata["file_path"],
-                    doc.text
-                )
-                doc.metadata.update(csharp_metadata)
-            except Exception as e:
-                logger.warning(
-                    f"Failed to extract metadata for {doc.metadata.get('file_path', 'unknown')}: {e}"
-                )
+            mtime = mtimes.get(file_path)
+            if mtime is None:
+                mtime = os.stat(file_path).st_mtime
+            doc.metadata["indexed_at"] = str(mtime)
         
-        logger.info(f"Added metadata to {len(filtered_docs)} documents")
-        return filtered_docs
+        # Extract C# metadata
+        for doc, csharp_metadata in zip(documents, self._extract_csharp_metadata(documents, executor)):
+            doc.metadata.update(csharp_metadata)
+        
+        logger.info(f"Added metadata to {len(documents)} documents")
+        return documents
     
-    def build_index(self, documents: List[Document]) -> VectorStoreIndex:
+    def _extract_csharp_metadata(
+        self,
+        documents: List[Document],
+        executor: Optional[Executor] = None
+    ) -> List[Dict[str, str]]:
         """
-        Build vector index from documents.
+        Run C# metadata extraction for each document.
+        
+        Regex extraction is pure CPU work, so large document sets are spread
+        across the refresh's existing process pool when there is one; no pool
+        is started just for this.
         
         Args:
-            documents: List of Document objects with metadata
+            documents: Documents to extract metadata from
+            executor: Optional process pool to extract in
             
         Returns:
-            Created VectorStoreIndex
+            Metadata dictionaries in document order (empty on failure)
+        """
+        payloads = [(doc.metadata.get("file_path", "unknown"), doc.text) for doc in documents]
+        extract = partial(_extract_worker, self.metadata_extractor)
+        
+        if executor is None or len(documents) < PARALLEL_METADATA_MIN_DOCS:
+            return [extract(payload) for payload in payloads]
+        
+        chunksize = max(1, len(documents) // (PARALLEL_LOAD_MAX_WORKERS * 4))
+        return list(executor.map(extract, payloads, chunksize=chunksize))
+    
+    def _create_storage_context(self) -> Tuple[Any, StorageContext]:
         """
-        # Initialize ChromaDB collection
-        chroma_collection = self.chroma_client.get_or_create_collection(self.collection_name)
+        Create a storage context backed by the ChromaDB collection.
+        
+        Returns:
+            Tuple of (ChromaDB collection, StorageContext wrapping its ChromaVectorStore)
+        """
+        if self._collection is None:
+            self._collection = self.chroma_client.get_or_create_collection(self.collection_name)
+        chroma_collection = self._collection
         vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
-        storage_context = StorageContext.from_defaults(vector_store=vector_store)
+        return chroma_collection, StorageContext.from_defaults(vector_store=vector_store)
+    
+    def _create_index(self, storage_context: StorageContext) -> VectorStoreIndex:
+        """
+        Wrap an already populated storage context in a VectorStoreIndex.
         
-        # Create index with configured transformations
-        logger.info(f"Building index with {len(documents)} documents...")
-        index = VectorStoreIndex.from_documents(
-            documents,
+        Args:
+            storage_context: Storage context whose vector store holds the nodes
+            
+        Returns:
+            VectorStoreIndex over the storage context
+        """
+        return VectorStoreIndex(
+            nodes=[],
             storage_context=storage_context,
             embed_model=self.embed_model,
-            transformations=self.transformations_list,
-            show_progress=True,
+            transformations=self.transformations_list or Settings.transformations,
             insert_batch_size=self.batch_size
         )
+    
+    def build_index(self, documents: Iterable[Document]) -> VectorStoreIndex:
+        """
+        Build vector index from documents, one micro-batch at a time.
+        
+        Each batch is split, embedded, and upserted before the next is
+        started, so only one batch of nodes and embeddings is held at once.
         
-        logger.info("Index built successfully")
-        return index
+        Args:
+            documents: Document objects with metadata (a list or any iterable)
+            
+        Returns:
+            Created VectorStoreIndex
+        """
+        chroma_collection, storage_context = self._create_storage_context()
+        transformations = self.transformations_list or Settings.transformations
+        
+        logger.info("Building index...")
+        document_count = 0
+        for batch in self._iter_batches(documents, self.batch_size):
+            nodes = run_transformations(batch, transformations, show_progress=True)
+            embeddings = self._embed_nodes(nodes)
+            skipped = self._upsert_nodes(chroma_collection, nodes, embeddings)
+            if skipped:
+                logger.warning(f"Skipped {skipped} records ChromaDB rejected")
+            for doc in batch:
+                storage_context.docstore.set_document_hash(doc.id_, doc.hash)
+            document_count += len(batch)
+            del nodes
+        
+        logger.info(f"Index built successfully from {document_count} documents")
+        return self._create_index(storage_context)
+    
+    def _iter_batches(self, items: Iterable, batch_size: int) -> Iterator[List]:
+        """
+        Yield consecutive batches from any iterable without materializing it.
+        
+        Args:
+            items: Items to batch (file paths, documents, ...)
+            batch_size: Maximum number of items per batch
+            
+        Yields:
+            Lists of at most batch_size items
+        """
+        iterator = iter(items)
+        while batch := list(islice(iterator, batch_size)):
+            yield batch
+    
+    def build_index_streaming(
+        self,
+        file_paths: List[str],
+        paths_list: List[str] = None,
+        mtimes: Dict[str, float] = None
+    ) -> Tuple[VectorStoreIndex, int, int, int]:
+        """
+        Load, filter, deduplicate, annotate, and index files one batch at a time.
+        
+        Only one batch of documents is resident at once, so peak memory is
+        bounded by the batch size rather than the corpus size. Embedded nodes
+        are upserted straight into the ChromaDB collection; the returned index
+        is a thin wrapper over the populated vector store.
+        
+        Args:
+            file_paths: Pre-filtered file paths to index
+            paths_list: Optional list of repository paths (for source_repo metadata)
+            mtimes: Optional file path -> mtime mapping captured during scanning
+            
+        Returns:
+            Tuple of (index, loaded_documents, indexed_documents, skipped_records),
+            where skipped_records counts chunks ChromaDB rejected
+            
+        Raises:
+            ValueError: If no documents remain after filtering
+            RuntimeError: If document loading fails
+        """
+        # Mirror the default VectorStoreIndex.from_documents falls back to
+        transformations = self.transformations_list or Settings.transformations
+        
+        chroma_collection, storage_context = self._create_storage_context()
+        
+        loaded_count = 0
+        indexed_count = 0
+        
+        # One filter per refresh so duplicates are detected across batches
+        duplicate_filter = NearDuplicateFilter()
+        
+        # One loader pool (if any) serves every batch of the refresh
+        with self._loader_pool(len(file_paths)) as load_executor:
+            # Embedding (main thread) and ChromaDB inserts (writer thread) overlap:
+            # batch N is written while batch N+1 is being embedded
+            insert_queue: queue.Queue = queue.Queue(maxsize=INSERT_QUEUE_SIZE)
+            writer_errors: List[BaseException] = []
+            skipped_records: List[int] = []
+            writer = threading.Thread(
+                target=self._insert_worker,
+                args=(chroma_collection, storage_context, insert_queue, writer_errors, skipped_records),
+                name="chroma-writer",
+                daemon=True
+            )
+            writer.start()
+            
+            try:
+                for batch_num, batch_paths in enumerate(
+                    self._iter_batches(file_paths, self.batch_size), start=1
+                ):
+                    if writer_errors:
+                        break
+                    
+                    logger.info(f"Processing batch {batch_num} ({len(batch_paths)} files)...")
+                    
+                    # Skip decoding files whose raw header already marks them generated
+                    batch_paths = self.file_filterer.prefilter_by_header_raw(batch_paths)
+                    if not batch_paths:
+                        continue
+                    
+                    documents = self.load_documents(batch_paths, load_executor)
+                    loaded_count += len(documents)
+                    
+                    filtered_docs = self.file_filterer.filter_documents_by_content(documents)
+                    del documents
+                    filtered_docs = duplicate_filter.filter_documents(filtered_docs)
+                    if not filtered_docs:
+                        continue
+                    
+                    self.add_metadata(filtered_docs, paths_list, mtimes, load_executor)
+                    indexed_count += len(filtered_docs)
+                    
+                    nodes = run_transformations(filtered_docs, transformations, show_progress=True)
+                    embeddings = self._embed_nodes(nodes)
+                    insert_queue.put((nodes, embeddings, filtered_docs))
+                    del filtered_docs, nodes, embeddings
+            finally:
+                # Sentinel tells the writer to stop once queued batches are flushed
+                insert_queue.put(None)
+                writer.join()
+        
+        if writer_errors:
+            raise RuntimeError(f"Error inserting into ChromaDB: {writer_errors[0]}")
+        
+        if indexed_count == 0:
+            raise ValueError("No documents remained after filtering. Check path and filter logic.")
+        
+        skipped_count = sum(skipped_records)
+        if skipped_count:
+            logger.warning(f"Skipped {skipped_count} records ChromaDB rejected")
+        
+        index = self._create_index(storage_context)
+        
+        logger.info(f"Index built successfully from {indexed_count} documents")
+        return index, loaded_count, indexed_count, skipped_count
+    
+    def _embed_nodes(self, nodes: List):
+        """
+        Compute embeddings for nodes in one batched call.
+        
+        The writer thread then only has to upsert the precomputed vectors.
+        Models that can return one (N, dim) float32 array do so, which skips
+        the per-float list conversion here and ChromaDB's conversion back.
+        
+        Args:
+            nodes: Nodes produced by the transformations
+            
+        Returns:
+            Embeddings in node order, as an ndarray or a list of vectors
+        """
+        texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+        embed_array = getattr(self.embed_model, "get_text_embedding_array", None)
+        if embed_array is not None:
+            return embed_array(texts)
+        return self.embed_model.get_text_embedding_batch(texts, show_progress=True)
+    
+    def _upsert_nodes(self, chroma_collection, nodes: List, embeddings) -> int:
+        """
+        Write embedded nodes directly to the ChromaDB collection.
+        
+        Produces the same records as ChromaVectorStore.add (node content is
+        serialized into the metadata), so the collection stays readable through
+        the LlamaIndex vector store, but skips the per-batch index bookkeeping.
+        Upsert keeps a retried batch from failing on duplicate IDs.
+        
+        Args:
+            chroma_collection: ChromaDB collection to write to
+            nodes: Nodes to write
+            embeddings: Embedding of each node (ndarray or list of vectors)
+            
+        Returns:
+            Number of records skipped because ChromaDB rejected them
+            
+        Raises:
+            RuntimeError: If ChromaDB rejected every record of a chunk, which
+                points at the collection (e.g. an embedding dimension
+                mismatch) rather than at individual records
+        """
+        skipped = 0
+        for start in range(0, len(nodes), self.upsert_batch_size):
+            chunk = nodes[start:start + self.upsert_batch_size]
+            metadatas = []
+            for node in chunk:
+                metadata = node_to_metadata_dict(node, remove_text=True, flat_metadata=True)
+                metadatas.append({k: "" if v is None else v for k, v in metadata.items()})
+            
+            rejected = self._upsert_records(
+                chroma_collection,
+                [node.node_id for node in chunk],
+                embeddings[start:start + self.upsert_batch_size],
+                [node.get_content(metadata_mode=MetadataMode.NONE) for node in chunk],
+                metadatas
+            )
+            if rejected == len(chunk):
+                raise RuntimeError(f"ChromaDB rejected all {rejected} records of an upsert chunk")
+            skipped += rejected
+        return skipped
+    
+    def _upsert_records(
+        self,
+        chroma_collection,
+        ids: List[str],
+        embeddings: List,
+        documents: List[str],
+        metadatas: List[Dict[str, Any]]
+    ) -> int:
+        """
+        Upsert one chunk of records, halving it and retrying if ChromaDB rejects it.
+        
+        A single bad record (or a limit lower than reported) then costs a few
+        smaller calls instead of failing the whole refresh: the halving narrows
+        the failure down to the offending records, which are logged and
+        skipped while every other record is written. Only record rejections
+        are retried; other errors propagate unchanged.
+        
+        Args:
+            chroma_collection: ChromaDB collection to write to
+            ids: Record IDs
+            embeddings: Record embeddings (ndarray rows or vectors)
+            documents: Record texts
+            metadatas: Record metadata dictionaries
+            
+        Returns:
+            Number of records skipped because ChromaDB rejected them
+            
+        Raises:
+            Exception: ChromaDB's error if it is not a record rejection
+        """
+        try:
+            chroma_collection.upsert(
+                ids=ids,
+                embeddings=embeddings,
+                documents=documents,
+                metadatas=metadatas
+            )
+            return 0
+        except _RECORD_REJECTION_ERRORS as e:
+            if len(ids) == 1:
+                source = metadatas[0].get("file_path", "unknown")
+                logger.error(f"Skipping record {ids[0]} from {source}: ChromaDB rejected it: {e}")
+                return 1
+            mid = len(ids) // 2
+            logger.warning(f"Upsert of {len(ids)} records failed: {e}. Retrying in halves of {mid}.")
+            return (
+                self._upsert_records(chroma_collection, ids[:mid], embeddings[:mid], documents[:mid], metadatas[:mid])
+                + self._upsert_records(chroma_collection, ids[mid:], embeddings[mid:], documents[mid:], metadatas[mid:])
+            )
+    
+    def _insert_worker(
+        self,
+        chroma_collection,
+        storage_context: StorageContext,
+        insert_queue: queue.Queue,
+        errors: List[BaseException],
+        skipped: List[int]
+    ) -> None:
+        """
+        Writer thread: upsert embedded batches into ChromaDB until a None sentinel.
+        
+        After the first failure the remaining batches are drained without
+        inserting so the producer never blocks on a full queue.
+        
+        Args:
+            chroma_collection: ChromaDB collection receiving the nodes
+            storage_context: Storage context whose docstore records document hashes
+            insert_queue: Queue of (nodes, embeddings, documents) tuples, terminated by None
+            errors: List the first exception is appended to
+            skipped: List the number of rejected records of each batch is appended to
+        """
+        while True:
+            item = insert_queue.get()
+            if item is None:
+                return
+            if errors:
+                continue
+            
+            nodes, embeddings, documents = item
+            try:
+                skipped.append(self._upsert_nodes(chroma_collection, nodes, embeddings))
+                for doc in documents:
+                    storage_context.docstore.set_document_hash(doc.id_, doc.hash)
+            except Exception as e:
+                logger.error(f"ChromaDB insert failed: {e}")
+                errors.append(e)
     
     def persist_index(self, index: VectorStoreIndex) -> None:
         """
@@ -244,16 +798,38 @@ class IndexManager:
         index.storage_context.persist(persist_dir=self.storage_path)
         logger.info(f"Index persisted to {self.storage_path}")
     
-    def refresh_index(self, repo_paths: str) -> Dict[str, Any]:
+    def _cached_splitters(self) -> List:
+        """
+        Get the transformations that keep an on-disk chunk cache.
+        
+        Returns:
+            Splitters with a cache_dir (e.g. FastCodeSplitter)
+        """
+        return [t for t in self.transformations_list if getattr(t, "cache_dir", None)]
+    
+    def clear_persisted_bm25(self) -> None:
+        """
+        Delete persisted BM25 indexes so they are rebuilt against the new collection.
+        """
+        storage = Path(self.storage_path)
+        if not storage.is_dir():
+            return
+        
+        for bm25_dir in storage.glob(f"{BM25_PERSIST_PREFIX}*"):
+            if bm25_dir.is_dir():
+                shutil.rmtree(bm25_dir, ignore_errors=True)
+                logger.info(f"Removed stale BM25 index: {bm25_dir}")
+    
+    def refresh_index(self, repo_paths: Union[str, List[str]]) -> Dict[str, Any]:
         """
         Complete index refresh workflow for single or multiple repositories.
         
         Orchestrates all steps:
         1. Parse and validate paths
         2. Scan and filter files from all paths
-        3. Load documents
+        3. Load documents (in batches)
         4. Filter by content and add metadata (including source_repo)
-        5. Build index
+        5. Insert each batch into the index
         6. Persist to disk
         
         Args:
@@ -262,6 +838,7 @@ class IndexManager:
                        - Single: "./Mutagen/Mutagen.Bethesda.Core"
                        - Comma: "path1,path2,path3"
                        - Newline: "path1\npath2\npath3"
+                       - List: ["path1", "path2", "path3"]
             
         Returns:
             Dictionary with statistics:
@@ -270,6 +847,7 @@ class IndexManager:
             - total_files: int
             - indexed_files: int
             - excluded_files: int
+            - skipped_records: int (chunks ChromaDB rejected)
             - storage_path: str
             - path_stats: dict (per-repository file counts)
             - num_repos: int (number of successfully processed repos)
@@ -277,17 +855,13 @@ class IndexManager:
         """
         start_time = time.time()
         
+        # Directory layout or symlinks may have changed since the last refresh
+        _resolved.cache_clear()
+        _resolved_dir.cache_clear()
+        
         try:
-            # Parse paths (support single, comma-separated, newline-separated)
-            if '\n' in repo_paths:
-                paths_list = [p.strip() for p in repo_paths.split('\n') if p.strip()]
-            elif ',' in repo_paths:
-                paths_list = [p.strip() for p in repo_paths.split(',') if p.strip()]
-            else:
-                paths_list = [repo_paths.strip()]
-            
-            # Remove empty paths
-            paths_list = [p for p in paths_list if p]
+            # Parse paths (support single, comma-separated, newline-separated, list)
+            paths_list = _parse_paths(repo_paths)
             
             if not paths_list:
                 raise ValueError("No valid paths provided")
@@ -296,6 +870,7 @@ class IndexManager:
             
             # Step 1-2: Scan all paths and collect files
             all_file_paths = []
+            file_mtimes = {}  # mtimes captured during scanning, reused for metadata
             path_stats = {}  # Track files per repository
             
             for repo_path in paths_list:
@@ -309,7 +884,9 @@ class IndexManager:
                 logger.info(f"Scanning repository at: {repo_path}")
                 
                 # Scan files for this path
-                file_paths = self.file_filterer.scan_files(repo_path_obj, extension=".cs")
+                path_mtimes = self.file_filterer.scan_files_with_mtimes(repo_path_obj, extension=".cs")
+                file_mtimes.update(path_mtimes)
+                file_paths = list(path_mtimes)
                 all_file_paths.extend(file_paths)
                 path_stats[repo_path] = len(file_paths)
                 logger.info(f"  → Found {len(file_paths)} .cs files in {repo_path}")
@@ -320,20 +897,22 @@ class IndexManager:
             total_files = len(all_file_paths)
             logger.info(f"Total pre-filtered files across all paths: {total_files}")
             
-            # Step 3: Load documents
-            documents = self.load_documents(all_file_paths)
+            # Step 3-5: Load, filter, add metadata, and index batch by batch
+            index, loaded_docs, indexed_files, skipped_records = self.build_index_streaming(
+                all_file_paths,
+                paths_list,
+                file_mtimes
+            )
+            excluded_files = total_files - indexed_files + (loaded_docs - indexed_files)
             
-            # Step 4: Filter by content and add metadata (including source_repo)
-            filtered_docs = self.filter_and_add_metadata(documents, paths_list)
-            indexed_files = len(filtered_docs)
-            excluded_files = total_files - indexed_files + (len(documents) - indexed_files)
-            
-            # Step 5: Build index
-            index = self.build_index(filtered_docs)
-            
-            # Step 6: Persist to disk
+            # Step 6: Persist to disk (stale BM25 indexes first)
+            self.clear_persisted_bm25()
             self.persist_index(index)
             
+            # Drop chunks no refresh has used for a long time (deleted or edited files)
+            for splitter in self._cached_splitters():
+                splitter.prune_cache()
+            
             elapsed_time = time.time() - start_time
             
             return {
@@ -342,6 +921,7 @@ class IndexManager:
                 "total_files": total_files,
                 "indexed_files": indexed_files,
                 "excluded_files": excluded_files,
+                "skipped_records": skipped_records,
                 "storage_path": self.storage_path,
                 "path_stats": path_stats,  # New: per-repository statistics
                 "num_repos": len([v for v in path_stats.values() if v > 0])
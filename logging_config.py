@@ -2,10 +2,12 @@
 Logging configuration module for Mutagen RAG system.
 Consolidates duplicate logging setup code and provides centralized logging initialization.
 """
+import atexit
 import os
+import queue
 import sys
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 
 from config import (
@@ -24,6 +26,9 @@ logger = logging.getLogger("mutagen-rag")
 # Log file path from environment variable or default
 LOG_FILE = os.getenv("MCP_LOG_FILE", str(REPO_ROOT / DEFAULT_LOG_FILE))
 
+# Background listener that writes queued records to the real handlers
+_listener = None
+
 
 def setup_logging():
     """
@@ -34,6 +39,9 @@ def setup_logging():
     - Rotating file handler for persistent logs
     - Consistent formatting across all handlers
     
+    The root logger only gets a QueueHandler, so logging from hot loops is a
+    queue put; formatting and disk/console I/O run on a listener thread.
+    
     Falls back to stderr-only logging if file handler cannot be created.
     """
     formatter = logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
@@ -44,13 +52,20 @@ def setup_logging():
     stderr_handler.setLevel(getattr(logging, LOG_LEVEL))
     
     # Get root logger and clear existing handlers
+    # (flushing any listener left over from a previous call)
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
     root = logging.getLogger()
     for h in root.handlers[:]:
         root.removeHandler(h)
     
-    # Add stderr handler
-    root.addHandler(stderr_handler)
+    # Route records through a queue; handlers are attached to the listener
+    log_queue = queue.SimpleQueue()
+    root.addHandler(QueueHandler(log_queue))
     root.setLevel(getattr(logging, LOG_LEVEL))
+    handlers = [stderr_handler]
     
     # Try to add file handler
     try:
@@ -69,17 +84,38 @@ def setup_logging():
         )
         file_handler.setFormatter(formatter)
         file_handler.setLevel(getattr(logging, LOG_LEVEL))
-        root.addHandler(file_handler)
-        
-        logger.info("Logging initialized to %s", LOG_FILE)
+        handlers.append(file_handler)
+        file_error = None
     except Exception as e:
+        file_error = e
+    
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    
+    if file_error is None:
+        logger.info("Logging initialized to %s", LOG_FILE)
+    else:
         logger.warning(
             "Cannot open log file %s: %s. Continuing with stderr only.",
             LOG_FILE,
-            e
+            file_error
         )
 
 
+def shutdown_logging():
+    """
+    Stop the queue listener, flushing any records still waiting to be written.
+    Registered with atexit; safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
 def get_logger(name: str = "mutagen-rag") -> logging.Logger:
     """
     Get a logger instance with the specified name.
@@ -10,6 +10,18 @@ from logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# Patterns are compiled once at import; each is scanned separately because a
+# fused alternation defeats the regex engine's literal-prefix search
+_NAMESPACE_RE = re.compile(r'namespace\s+([\w\.]+)')
+_TYPE_RE = re.compile(r'(class|interface|struct|enum|record)\s+([\w]+)')
+_METHOD_RE = re.compile(
+    r'public\s+(?:static\s+|virtual\s+|override\s+|async\s+)?[\w<>\[\]]+\s+([\w]+)\s*\('
+)
+
+# Literals every match of the corresponding pattern must contain; a substring
+# test is far cheaper than a regex scan that finds nothing
+_TYPE_KEYWORDS = ("class", "interface", "struct", "enum", "record")
+
 
 class MetadataExtractor:
     """
@@ -40,7 +52,9 @@ class MetadataExtractor:
         Returns:
             Namespace name if found, None otherwise
         """
-        namespace_match = re.search(r'namespace\s+([\w\.]+)', content)
+        if "namespace" not in content:
+            return None
+        namespace_match = _NAMESPACE_RE.search(content)
         if namespace_match:
             return namespace_match.group(1)
         return None
@@ -55,13 +69,9 @@ class MetadataExtractor:
         Returns:
             List of type definitions in format "type:Name"
         """
-        types = []
-        for match in re.finditer(
-            r'(class|interface|struct|enum|record)\s+([\w]+)',
-            content
-        ):
-            types.append(f"{match.group(1)}:{match.group(2)}")
-        return types
+        if not any(keyword in content for keyword in _TYPE_KEYWORDS):
+            return []
+        return [f"{kind}:{name}" for kind, name in _TYPE_RE.findall(content)]
     
     def extract_methods(self, content: str) -> List[str]:
         """
@@ -76,8 +86,9 @@ class MetadataExtractor:
         Returns:
             List of unique public method names
         """
-        method_pattern = r'public\s+(?:static\s+|virtual\s+|override\s+|async\s+)?[\w<>\[\]]+\s+([\w]+)\s*\('
-        methods = re.findall(method_pattern, content)
+        if "public" not in content:
+            return []
+        methods = _METHOD_RE.findall(content)
         
         # Remove duplicates while preserving order
         unique_methods = list(dict.fromkeys(methods))
@@ -0,0 +1,250 @@
+"""
+Reranker module for Mutagen RAG system.
+Runs the cross-encoder on a selectable backend (ONNX Runtime, OpenVINO, or PyTorch).
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.callbacks import CBEventType, EventPayload
+from llama_index.core.postprocessor import SentenceTransformerRerank
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.postprocessor.sbert_rerank import DEFAULT_SENTENCE_TRANSFORMER_MAX_LENGTH
+from llama_index.core.schema import MetadataMode, NodeWithScore, QueryBundle
+from llama_index.core.utils import infer_torch_device
+
+
+class LexicalScoredNode(NodeWithScore):
+    """
+    NodeWithScore that also carries the node's raw BM25 score.
+    """
+    
+    bm25_score: Optional[float] = None  # None when BM25 did not retrieve the node
+
+
+class BackendRerank(SentenceTransformerRerank):
+    """
+    SentenceTransformerRerank with a selectable CrossEncoder backend.
+    
+    All (query, node) pairs go through one batched CrossEncoder.predict call.
+    An FP16 ONNX export can be selected with model_kwargs={"file_name": ...}.
+    Only the first max_candidates retrieved nodes are scored, and the final
+    score can keep a share of the (normalized) retrieval score. With
+    bm25_in_input, each query is prefixed with the node's BM25 score
+    ("[BM25=3.21] query"), for cross-encoders fine-tuned on that format.
+    Scores are cached per (query, node content) pair, so repeated queries
+    skip the forward pass; copies made with model_copy share the cache.
+    """
+    
+    backend: str = "onnx"
+    retrieval_weight: float = 0.0
+    max_candidates: Optional[int] = None
+    bm25_in_input: bool = False
+    score_cache_size: int = 0
+    
+    _score_cache: "OrderedDict[Tuple[str, str], float]" = PrivateAttr(default_factory=OrderedDict)
+    _score_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    
+    def __init__(
+        self,
+        top_n: int = 2,
+        model: str = "cross-encoder/stsb-distilroberta-base",
+        backend: str = "onnx",
+        model_kwargs: Optional[Dict[str, Any]] = None,
+        retrieval_weight: float = 0.0,
+        max_candidates: Optional[int] = None,
+        bm25_in_input: bool = False,
+        score_cache_size: int = 0,
+        device: Optional[str] = None,
+        keep_retrieval_score: bool = False,
+        trust_remote_code: bool = True,
+    ):
+        """
+        Load the cross-encoder on the requested backend.
+        
+        Args:
+            top_n: Number of nodes to return after reranking
+            model: Cross-encoder model name
+            backend: CrossEncoder backend ("onnx", "openvino", or "torch")
+            model_kwargs: Backend options, e.g. {"file_name": "onnx/model_O4.onnx"}
+            retrieval_weight: Share of the retrieval score in the final score (0 = cross-encoder only)
+            max_candidates: Maximum number of retrieved nodes to score (None = all)
+            bm25_in_input: Whether to prefix each query with the node's BM25 score
+            score_cache_size: Maximum number of cached pair scores (0 = no cache)
+            device: Device to run on (inferred when None)
+            keep_retrieval_score: Whether to keep the retrieval score in metadata
+            trust_remote_code: Whether to trust remote model code
+        
+        Raises:
+            ImportError: If sentence-transformers is not installed
+        """
+        from sentence_transformers import CrossEncoder
+        
+        device = infer_torch_device() if device is None else device
+        # Skip SentenceTransformerRerank.__init__, which would load a second
+        # PyTorch copy of the model
+        BaseNodePostprocessor.__init__(
+            self,
+            top_n=top_n,
+            model=model,
+            device=device,
+            keep_retrieval_score=keep_retrieval_score,
+            backend=backend,
+            retrieval_weight=retrieval_weight,
+            max_candidates=max_candidates,
+            bm25_in_input=bm25_in_input,
+            score_cache_size=score_cache_size
+        )
+        self._model = CrossEncoder(
+            model,
+            max_length=DEFAULT_SENTENCE_TRANSFORMER_MAX_LENGTH,
+            device=device,
+            trust_remote_code=trust_remote_code,
+            backend=backend,
+            model_kwargs=model_kwargs or {}
+        )
+    
+    @classmethod
+    def class_name(cls) -> str:
+        return "BackendRerank"
+    
+    def warmup(self) -> None:
+        """
+        Run one throwaway pair through the cross-encoder.
+        
+        Initializes the backend session (and CUDA kernels on GPU) without
+        touching the score cache.
+        """
+        self._model.predict([("warmup", "warmup")], batch_size=1)
+    
+    def clear_score_cache(self) -> None:
+        """
+        Drop all cached pair scores.
+        """
+        with self._score_lock:
+            self._score_cache.clear()
+    
+    def _score_pairs(
+        self,
+        query_and_nodes: List[Tuple[str, str]],
+        keys: List[Tuple[str, str]]
+    ) -> List[float]:
+        """
+        Score (query, text) pairs, running the cross-encoder only on cache misses.
+        
+        Args:
+            query_and_nodes: Pairs to score
+            keys: Cache key of each pair
+            
+        Returns:
+            Cross-encoder score of each pair
+        """
+        with self._score_lock:
+            scores = [self._score_cache.get(key) for key in keys]
+            for key, score in zip(keys, scores):
+                if score is not None:
+                    self._score_cache.move_to_end(key)
+        
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if not missing:
+            return scores
+        
+        # One forward pass over every uncached pair
+        new_scores = self._model.predict(
+            [query_and_nodes[i] for i in missing],
+            batch_size=len(missing)
+        )
+        for i, score in zip(missing, new_scores):
+            scores[i] = float(score)
+        
+        if self.score_cache_size > 0:
+            with self._score_lock:
+                for i in missing:
+                    self._score_cache[keys[i]] = scores[i]
+                    self._score_cache.move_to_end(keys[i])
+                while len(self._score_cache) > self.score_cache_size:
+                    self._score_cache.popitem(last=False)
+        
+        return scores
+    
+    def _query_text(self, query_str: str, node: NodeWithScore) -> str:
+        """
+        Build the query side of a cross-encoder pair.
+        
+        Args:
+            query_str: Search query
+            node: Candidate node (a LexicalScoredNode after hybrid fusion)
+            
+        Returns:
+            The query, prefixed with the node's BM25 score if bm25_in_input is set
+        """
+        if not self.bm25_in_input:
+            return query_str
+        bm25_score = getattr(node, "bm25_score", None) or 0.0
+        return f"[BM25={bm25_score:.2f}] {query_str}"
+    
+    def _postprocess_nodes(
+        self,
+        nodes: List[NodeWithScore],
+        query_bundle: Optional[QueryBundle] = None,
+    ) -> List[NodeWithScore]:
+        """
+        Score the leading candidates with the cross-encoder and keep the top_n.
+        
+        Args:
+            nodes: Retrieved nodes, best first
+            query_bundle: Query to score the nodes against
+        
+        Returns:
+            Up to top_n nodes sorted by final score
+        
+        Raises:
+            ValueError: If no query bundle is given
+        """
+        if query_bundle is None:
+            raise ValueError("Missing query bundle in extra info.")
+        if len(nodes) == 0:
+            return []
+        
+        # Retrieval order is best-first, so the tail is not worth a model pass
+        if self.max_candidates:
+            nodes = nodes[:max(self.max_candidates, self.top_n)]
+        
+        query_and_nodes = [
+            (
+                self._query_text(query_bundle.query_str, node),
+                node.node.get_content(metadata_mode=MetadataMode.EMBED)
+            )
+            for node in nodes
+        ]
+        # The content hash (not the node id) keys the cache, so a refreshed
+        # index never reuses a score computed for old text
+        keys = [(query, node.node.hash) for (query, _), node in zip(query_and_nodes, nodes)]
+        
+        with self.callback_manager.event(
+            CBEventType.RERANKING,
+            payload={
+                EventPayload.NODES: nodes,
+                EventPayload.MODEL_NAME: self.model,
+                EventPayload.QUERY_STR: query_bundle.query_str,
+                EventPayload.TOP_K: self.top_n,
+            },
+        ) as event:
+            scores = self._score_pairs(query_and_nodes, keys)
+            
+            # Retrieval scores (RRF or cosine) are rescaled so the best is 1.0,
+            # putting them on the cross-encoder's 0-1 scale before blending
+            top_retrieval = max(abs(node.score or 0.0) for node in nodes) or 1.0
+            weight = self.retrieval_weight
+            
+            for node, score in zip(nodes, scores):
+                if self.keep_retrieval_score:
+                    node.node.metadata["retrieval_score"] = node.score
+                retrieval = (node.score or 0.0) / top_retrieval
+                node.score = weight * retrieval + (1.0 - weight) * score
+            
+            new_nodes = sorted(nodes, key=lambda x: -x.score)[:self.top_n]
+            event.on_end(payload={EventPayload.NODES: new_nodes})
+        
+        return new_nodes
@@ -2,6 +2,13 @@
 Search engine module for Mutagen RAG system.
 Implements hybrid search combining BM25 (sparse) and vector (dense) retrieval with reranking.
 """
+import copy
+import functools
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
 from typing import Optional, List, Tuple, Dict, Any
 from dataclasses import dataclass
 
@@ -11,9 +18,12 @@ from llama_index.core import (
     QueryBundle
 )
 from llama_index.core.schema import TextNode, NodeWithScore
+from llama_index.core.vector_stores.utils import metadata_dict_to_node
 from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.retrievers.bm25 import BM25Retriever
+from bm25s.stopwords import STOPWORDS_EN
 from llama_index.core.retrievers import QueryFusionRetriever
+from llama_index.core.retrievers.fusion_retriever import FUSION_MODES
 from llama_index.core.postprocessor import SentenceTransformerRerank
 import chromadb
 
@@ -22,16 +32,70 @@ from config import (
     COLLECTION_NAME,
     DEFAULT_TOP_K,
     BM25_MULTIPLIER,
+    BM25_MIN_QUERY_TOKENS,
+    BM25_CACHE_SIZE,
+    BM25_PERSIST_PREFIX,
+    BM25_NUMBA_SCORING,
     VECTOR_MULTIPLIER,
+    MIN_RETRIEVAL_CANDIDATES,
+    FUSION_DENSE_WEIGHT,
     RERANKER_MODEL_NAME,
-    RERANK_TOP_N_RATIO
+    RERANKER_BACKEND,
+    RERANKER_ONNX_FILE,
+    RERANK_TOP_N_RATIO,
+    RERANK_MAX_CANDIDATES,
+    RERANK_ALPHA,
+    RERANK_BM25_IN_INPUT,
+    RERANK_SCORE_CACHE_SIZE,
+    CHROMA_FETCH_PAGE_SIZE
 )
 from logging_config import get_logger
+from reranker import BackendRerank, LexicalScoredNode
+
+# BLAKE3 is optional; hashlib's blake2b is used for fingerprints without it
+try:
+    from blake3 import blake3 as _fingerprint_hasher
+except ImportError:
+    _fingerprint_hasher = hashlib.blake2b
+
+# numba is optional; without it bm25s scores queries with NumPy
+try:
+    import numba  # noqa: F401
+    _NUMBA_AVAILABLE = True
+except ImportError:
+    _NUMBA_AVAILABLE = False
+
+
+@functools.lru_cache(maxsize=None)
+def _cache_numba_kernels() -> None:
+    """
+    Turn on Numba's on-disk cache for bm25s's kernels, once per process.
+    
+    bm25s compiles them with @njit and no cache, so every process would pay
+    the seconds-long compile again; cached, a restarted server loads them
+    from __pycache__ (or NUMBA_CACHE_DIR) in well under a second.
+    """
+    from numba.core.registry import CPUDispatcher
+    from bm25s.numba import retrieve_utils, selection
+    
+    for module in (retrieve_utils, selection):
+        for kernel in vars(module).values():
+            if isinstance(kernel, CPUDispatcher):
+                kernel.enable_caching()
+
+# Word tokens of a query, and tokens that look like code identifiers: C# type
+# and member names are capitalized (Weapon, Npc, FormLink), others have a
+# camel hump, an underscore, or a digit
+_QUERY_TOKEN_RE = re.compile(r"\w+")
+_IDENTIFIER_RE = re.compile(r"^[A-Z]|[a-z][A-Z]|_|\d")
+
+# The stopwords BM25Retriever itself drops, so skipped queries are ones BM25 cannot score
+_QUERY_STOPWORDS = frozenset(STOPWORDS_EN)
 
 logger = get_logger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class SearchResult:
     """
     Container for search results.
@@ -42,6 +106,72 @@ class SearchResult:
     error: Optional[str] = None
 
 
+def _candidate_count(top_k: int, multiplier: int) -> int:
+    """Number of candidates to retrieve for top_k final results."""
+    return max(top_k * multiplier, MIN_RETRIEVAL_CANDIDATES)
+
+
+class BM25ScoreFusionRetriever(QueryFusionRetriever):
+    """
+    QueryFusionRetriever doing weighted reciprocal rank fusion.
+    
+    Each retriever contributes weight * n / (60 + rank), so equal weights give
+    exactly the plain RRF scores (QueryFusionRetriever ignores retriever
+    weights in this mode). Fusion replaces node scores, so the raw BM25 score
+    is carried alongside on a LexicalScoredNode for the reranker.
+    """
+    
+    def __init__(self, retrievers: List[Any], bm25_position: int, **kwargs: Any):
+        """
+        Initialize the fusion retriever.
+        
+        Args:
+            retrievers: Retrievers whose results are fused
+            bm25_position: Index of the BM25 retriever in retrievers
+            **kwargs: Passed through to QueryFusionRetriever (e.g. retriever_weights)
+        """
+        super().__init__(retrievers, **kwargs)
+        self._bm25_position = bm25_position
+    
+    def _reciprocal_rerank_fusion(
+        self,
+        results: Dict[Tuple[str, int], List[NodeWithScore]]
+    ) -> List[NodeWithScore]:
+        """
+        Fuse ranks with per-retriever weights, recording BM25 scores on the way.
+        
+        Args:
+            results: Retrieved nodes keyed by (query, retriever index)
+            
+        Returns:
+            Fused nodes as LexicalScoredNode, best first
+        """
+        k = 60.0  # constant from the original RRF paper
+        num_retrievers = len(self._retrievers)
+        fused_scores: Dict[str, float] = {}
+        hash_to_node: Dict[str, NodeWithScore] = {}
+        bm25_scores: Dict[str, float] = {}
+        
+        for (_, position), nodes_with_scores in results.items():
+            weight = self._retriever_weights[position] * num_retrievers
+            ranked = sorted(nodes_with_scores, key=lambda x: x.score or 0.0, reverse=True)
+            for rank, node_with_score in enumerate(ranked):
+                node_hash = node_with_score.node.hash
+                hash_to_node[node_hash] = node_with_score
+                fused_scores[node_hash] = fused_scores.get(node_hash, 0.0) + weight / (rank + k)
+                if position == self._bm25_position:
+                    bm25_scores[node_hash] = node_with_score.score or 0.0
+        
+        return [
+            LexicalScoredNode(
+                node=hash_to_node[node_hash].node,
+                score=score,
+                bm25_score=bm25_scores.get(node_hash)
+            )
+            for node_hash, score in sorted(fused_scores.items(), key=lambda x: x[1], reverse=True)
+        ]
+
+
 class HybridSearchEngine:
     """
     Hybrid search engine combining BM25 and vector retrieval with reranking.
@@ -59,7 +189,8 @@ class HybridSearchEngine:
         embed_model,
         storage_path: str = None,
         collection_name: str = None,
-        reranker_model: str = None
+        reranker_model: str = None,
+        numba_scoring: bool = None
     ):
         """
         Initialize the hybrid search engine.
@@ -70,26 +201,276 @@ class HybridSearchEngine:
             storage_path: Path to stored index metadata
             collection_name: Name of the ChromaDB collection
             reranker_model: Name of the reranker model
+            numba_scoring: Whether to compile and switch BM25 to Numba scoring
+                (defaults to BM25_NUMBA_SCORING; short-lived processes should
+                turn it off, since they exit before the compile pays off)
         """
         self.chroma_client = chroma_client
         self.embed_model = embed_model
         self.storage_path = storage_path or STORAGE_PATH
         self.collection_name = collection_name or COLLECTION_NAME
         self.reranker_model = reranker_model or RERANKER_MODEL_NAME
+        self.numba_scoring = BM25_NUMBA_SCORING if numba_scoring is None else numba_scoring
+        
+        # Cached BM25 retrievers keyed by (index version, top_k), LRU-bounded
+        # The version is bumped on every clear_cache() so stale entries never match
+        self._bm25_cache: "OrderedDict[Tuple[int, int], BM25Retriever]" = OrderedDict()
+        self._bm25_version = 0
+        
+        # (index version, fingerprint) of the last collection hash, so the ID
+        # walk runs at most once per index version
+        self._fingerprint_cache: Optional[Tuple[int, str]] = None
+        
+        # Searches may run concurrently in worker threads; BM25 cache lookups,
+        # builds, and invalidation are serialized so an index is built once
+        self._bm25_lock = threading.Lock()
         
-        # Cached BM25 retriever (replaces global variable)
-        self._bm25_retriever: Optional[BM25Retriever] = None
+        # (index version, collection, index) loaded once and reused across
+        # searches until clear_cache() bumps the version
+        self._index_cache: Optional[Tuple[int, Any, Any]] = None
+        self._index_lock = threading.Lock()
+        
+        # Collection handle, looked up until the collection exists; refreshes
+        # upsert into the same collection, so the handle outlives clear_cache()
+        self._collection = None
+        
+        # (vector retriever, final retriever) pairs keyed by (index version,
+        # top_k, use_bm25), so repeated searches skip retriever construction
+        self._retriever_cache: "OrderedDict[Tuple[int, int, bool], Tuple[Any, Any]]" = OrderedDict()
+        self._retriever_lock = threading.Lock()
+        
+        # Rerankers keyed by top_n; all share one loaded cross-encoder so the
+        # weights are read from disk once and stay resident on the device
+        self._reranker_cache: Dict[int, SentenceTransformerRerank] = {}
+        self._reranker_lock = threading.Lock()
         
         logger.info("HybridSearchEngine initialized")
     
     def clear_cache(self) -> None:
         """
-        Clear the BM25 retriever cache.
+        Clear the cached index, BM25 retrievers, and reranker scores.
         Should be called when the index is refreshed.
         """
-        self._bm25_retriever = None
+        with self._bm25_lock:
+            self._bm25_version += 1
+            self._bm25_cache.clear()
+        with self._index_lock:
+            self._index_cache = None
+        with self._retriever_lock:
+            self._retriever_cache.clear()
+        # All cached rerankers share one score cache, so clearing any clears it
+        with self._reranker_lock:
+            reranker = next(iter(self._reranker_cache.values()), None)
+        if reranker is not None:
+            reranker.clear_score_cache()
         logger.info("Cleared BM25 retriever cache")
     
+    def _cache_bm25(self, key: Tuple[int, int], retriever: BM25Retriever) -> None:
+        """
+        Store a BM25 retriever, evicting the least recently used entry if full.
+        
+        Args:
+            key: (index version, top_k) cache key
+            retriever: BM25Retriever to cache
+        """
+        self._bm25_cache[key] = retriever
+        self._bm25_cache.move_to_end(key)
+        while len(self._bm25_cache) > BM25_CACHE_SIZE:
+            self._bm25_cache.popitem(last=False)
+        
+        # The first Numba call compiles for seconds, so compile off the search path
+        if self.numba_scoring and _NUMBA_AVAILABLE and retriever.bm25.backend != "numba":
+            threading.Thread(
+                target=self._enable_numba_scoring,
+                args=(retriever,),
+                name="bm25-numba-compile",
+                daemon=True
+            ).start()
+    
+    @staticmethod
+    def _enable_numba_scoring(retriever: BM25Retriever) -> bool:
+        """
+        Compile the Numba BM25 kernels for a retriever, then switch it over.
+        
+        The warm-up query runs on a shallow copy sharing the retriever's
+        arrays, so the kernels are compiled for the exact array types
+        (e.g. read-only memory maps) while searches keep using NumPy scoring.
+        Compiled kernels are cached on disk, so later processes load them.
+        
+        Args:
+            retriever: Cached BM25Retriever to switch to the numba backend
+            
+        Returns:
+            True if the retriever now scores with Numba, False otherwise
+        """
+        try:
+            _cache_numba_kernels()
+        except Exception as e:
+            logger.warning(f"Numba kernel cache not available: {e}. Compiling uncached.")
+        
+        try:
+            model = copy.copy(retriever.bm25)
+            model.backend = "numba"
+            token = next(iter(model.vocab_dict))
+            model.retrieve([[token]], k=1, show_progress=False)
+        except Exception as e:
+            logger.warning(f"Numba BM25 scoring not available: {e}. Using NumPy scoring.")
+            return False
+        
+        retriever.bm25.backend = "numba"
+        logger.info("BM25 retriever switched to Numba scoring")
+        return True
+    
+    def _collection_fingerprint(self, chroma_collection) -> str:
+        """
+        Compute a short content fingerprint of the ChromaDB collection.
+        
+        Node IDs are regenerated on every index refresh, so hashing the sorted
+        ID list is enough to detect a changed collection without reading documents.
+        The result is reused until clear_cache() bumps the index version.
+        
+        Args:
+            chroma_collection: ChromaDB collection
+            
+        Returns:
+            16-character hex digest identifying the collection contents
+        """
+        if self._fingerprint_cache is not None:
+            version, fingerprint = self._fingerprint_cache
+            if version == self._bm25_version:
+                return fingerprint
+        
+        # Feed IDs incrementally rather than hashing one giant joined string
+        hasher = _fingerprint_hasher()
+        for node_id in sorted(chroma_collection.get(include=[])["ids"]):
+            hasher.update(node_id.encode())
+            hasher.update(b"\0")
+        fingerprint = hasher.hexdigest()[:16]
+        
+        self._fingerprint_cache = (self._bm25_version, fingerprint)
+        return fingerprint
+    
+    def _bm25_persist_dir(self, fingerprint: str) -> Path:
+        """
+        Get the on-disk location of the persisted BM25 index for a fingerprint.
+        
+        Args:
+            fingerprint: Collection fingerprint from _collection_fingerprint
+            
+        Returns:
+            Path to the BM25 persist directory under the storage path
+        """
+        return Path(self.storage_path) / f"{BM25_PERSIST_PREFIX}{fingerprint}"
+    
+    def _load_persisted_bm25(
+        self,
+        persist_dir: Path,
+        similarity_top_k: int
+    ) -> Optional[BM25Retriever]:
+        """
+        Load a persisted BM25 retriever, memory-mapping its arrays.
+        
+        The persisted postings do not depend on top_k, so one directory serves
+        every top_k; the requested value is applied after loading.
+        
+        Args:
+            persist_dir: Directory previously written by BM25Retriever.persist
+            similarity_top_k: Number of candidates the retriever should return
+            
+        Returns:
+            BM25Retriever instance or None if nothing usable is on disk
+        """
+        if not persist_dir.is_dir():
+            return None
+        
+        try:
+            retriever = BM25Retriever.from_persist_dir(str(persist_dir), mmap=True)
+            # bm25s requires k <= number of indexed documents
+            num_docs = int(retriever.bm25.scores.get("num_docs", similarity_top_k))
+            retriever.similarity_top_k = min(similarity_top_k, num_docs)
+            logger.info(f"Loaded persisted BM25 index from {persist_dir}")
+            return retriever
+        except Exception as e:
+            logger.warning(f"Failed to load persisted BM25 index from {persist_dir}: {e}. Rebuilding.")
+            return None
+    
+    def _persist_bm25(self, retriever: BM25Retriever, persist_dir: Path) -> bool:
+        """
+        Persist a freshly built BM25 retriever so later cold starts can skip tokenization.
+        
+        Args:
+            retriever: BM25Retriever to persist
+            persist_dir: Target directory
+            
+        Returns:
+            True if the retriever was written successfully
+        """
+        try:
+            retriever.persist(str(persist_dir))
+            logger.info(f"Persisted BM25 index to {persist_dir}")
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to persist BM25 index to {persist_dir}: {e}")
+            return False
+    
+    def _fetch_nodes_from_chroma(self, chroma_collection) -> List[TextNode]:
+        """
+        Read all stored chunks back from ChromaDB as TextNodes.
+        
+        Reads the ID list once, then fetches documents and metadata page by
+        page for slices of it. Paging with offset would make ChromaDB skip
+        over every earlier row again for each page; an ID lookup does not.
+        Each page is converted to nodes and released before the next is read.
+        
+        Args:
+            chroma_collection: ChromaDB collection
+            
+        Returns:
+            List of TextNode objects (empty if the collection is empty)
+        """
+        all_ids = chroma_collection.get(include=[])["ids"]
+        nodes = []
+        
+        for start in range(0, len(all_ids), CHROMA_FETCH_PAGE_SIZE):
+            data = chroma_collection.get(
+                ids=all_ids[start:start + CHROMA_FETCH_PAGE_SIZE],
+                include=["documents", "metadatas"]
+            )
+            ids = data["ids"]
+            metadatas = data.get("metadatas") or [None] * len(ids)
+            nodes.extend(
+                self._record_to_node(node_id, text, metadata)
+                for node_id, text, metadata in zip(ids, data["documents"], metadatas)
+            )
+            del data
+        
+        return nodes
+    
+    @staticmethod
+    def _record_to_node(node_id: str, text: str, metadata: Optional[dict]) -> TextNode:
+        """
+        Rebuild a node from a ChromaDB record the way ChromaVectorStore does.
+        
+        Decoding the serialized node drops the vector store's bookkeeping keys
+        (_node_content, _node_type, ...) from the metadata, so the BM25 corpus
+        holds only the real metadata and nodes match those from vector search.
+        
+        Args:
+            node_id: Record ID
+            text: Stored document text
+            metadata: Stored metadata (may be None)
+            
+        Returns:
+            TextNode for the record
+        """
+        if metadata:
+            try:
+                return metadata_dict_to_node(metadata, text=text)
+            except Exception:
+                # Records not written by ChromaVectorStore: keep metadata as-is
+                pass
+        return TextNode(text=text or "", id_=node_id, metadata=metadata or {})
+    
     def _build_bm25_retriever(
         self,
         index,
@@ -99,6 +480,9 @@ class HybridSearchEngine:
         """
         Build or retrieve cached BM25 retriever.
         
+        Lookup order: in-memory cache, persisted index matching the current
+        collection fingerprint, then a fresh build (which is persisted).
+        
         Args:
             index: VectorStoreIndex instance
             chroma_collection: ChromaDB collection
@@ -108,40 +492,57 @@ class HybridSearchEngine:
             BM25Retriever instance or None if building fails
         """
         # Return cached retriever if available
-        if self._bm25_retriever is not None:
+        cache_key = (self._bm25_version, top_k)
+        cached = self._bm25_cache.get(cache_key)
+        if cached is not None:
+            self._bm25_cache.move_to_end(cache_key)
             logger.info("Using cached BM25 retriever")
-            return self._bm25_retriever
+            return cached
         
-        # Build new BM25 retriever
-        logger.info("Building new BM25 retriever...")
+        similarity_top_k = _candidate_count(top_k, BM25_MULTIPLIER)
         
         try:
-            # Try to get nodes from docstore first
-            nodes = list(index.docstore.docs.values())
+            # Reuse the on-disk BM25 index if the collection is unchanged
+            persist_dir = self._bm25_persist_dir(
+                self._collection_fingerprint(chroma_collection)
+            )
+            retriever = self._load_persisted_bm25(persist_dir, similarity_top_k)
+            if retriever is not None:
+                self._cache_bm25(cache_key, retriever)
+                return retriever
+            
+            # Build new BM25 retriever
+            logger.info("Building new BM25 retriever...")
+            
+            # Try to get nodes from docstore first; vector stores that keep the
+            # text (ChromaDB) leave it empty, so skip deserializing it for them
+            nodes = []
+            if not index.vector_store.stores_text:
+                nodes = list(index.docstore.docs.values())
             
             # If docstore is empty, fetch from ChromaDB
             if not nodes:
                 logger.info("Docstore empty, fetching nodes from ChromaDB for BM25...")
-                data = chroma_collection.get()
-                
-                if data and data.get('documents'):
-                    for i, text in enumerate(data['documents']):
-                        node = TextNode(
-                            text=text,
-                            id_=data['ids'][i],
-                            metadata=data.get('metadatas', [{}])[i] if data.get('metadatas') else {}
-                        )
-                        nodes.append(node)
+                nodes = self._fetch_nodes_from_chroma(chroma_collection)
             
             # Build BM25 index from nodes
             if nodes:
                 logger.info(f"Building BM25 index from {len(nodes)} nodes...")
-                self._bm25_retriever = BM25Retriever.from_defaults(
+                # bm25s requires k <= number of indexed documents
+                retriever = BM25Retriever.from_defaults(
                     nodes=nodes,
-                    similarity_top_k=top_k * BM25_MULTIPLIER
+                    similarity_top_k=min(similarity_top_k, len(nodes))
                 )
+                del nodes
+                
+                # Reopen from disk so the cached copy holds memory-mapped score
+                # arrays and corpus instead of heap-resident ones
+                if self._persist_bm25(retriever, persist_dir):
+                    retriever = self._load_persisted_bm25(persist_dir, similarity_top_k) or retriever
+                
+                self._cache_bm25(cache_key, retriever)
                 logger.info("BM25 retriever cached successfully")
-                return self._bm25_retriever
+                return retriever
             else:
                 logger.warning("No nodes found for BM25")
                 return None
@@ -150,11 +551,34 @@ class HybridSearchEngine:
             logger.error(f"Failed to initialize BM25Retriever: {e}")
             return None
     
+    @staticmethod
+    def _has_lexical_anchors(query: str) -> bool:
+        """
+        Decide whether a query carries enough keywords for BM25 to add signal.
+        
+        Args:
+            query: Search query string
+            
+        Returns:
+            True if the query contains a code identifier (even a single type
+            name) or at least BM25_MIN_QUERY_TOKENS non-stopword tokens,
+            False otherwise
+        """
+        content_tokens = 0
+        for token in _QUERY_TOKEN_RE.findall(query):
+            if token.lower() in _QUERY_STOPWORDS:
+                continue
+            if _IDENTIFIER_RE.search(token):
+                return True
+            content_tokens += 1
+        return content_tokens >= BM25_MIN_QUERY_TOKENS
+    
     def _get_retrievers(
         self,
         index,
         chroma_collection,
-        top_k: int
+        top_k: int,
+        use_bm25: bool = True
     ) -> Tuple[Any, Optional[BM25Retriever]]:
         """
         Get vector and BM25 retrievers.
@@ -163,20 +587,84 @@ class HybridSearchEngine:
             index: VectorStoreIndex instance
             chroma_collection: ChromaDB collection
             top_k: Number of top results
+            use_bm25: Whether to build the BM25 retriever at all
             
         Returns:
-            Tuple of (vector_retriever, bm25_retriever)
+            Tuple of (vector_retriever, bm25_retriever); the BM25 retriever is
+            None when skipped or unavailable
         """
         # Vector retriever (dense search)
         retriever_vector = index.as_retriever(
-            similarity_top_k=top_k * VECTOR_MULTIPLIER
+            similarity_top_k=_candidate_count(top_k, VECTOR_MULTIPLIER)
         )
         
         # BM25 retriever (sparse search)
-        retriever_bm25 = self._build_bm25_retriever(index, chroma_collection, top_k)
+        retriever_bm25 = None
+        if use_bm25:
+            with self._bm25_lock:
+                retriever_bm25 = self._build_bm25_retriever(index, chroma_collection, top_k)
         
         return retriever_vector, retriever_bm25
     
+    def _get_search_retrievers(
+        self,
+        index,
+        chroma_collection,
+        top_k: int,
+        use_bm25: bool
+    ) -> Tuple[Any, Any]:
+        """
+        Get the vector retriever and the retriever a search should query.
+        
+        Both depend only on the loaded index, top_k, and whether BM25 is used,
+        so they are built once and reused until clear_cache(). A failed BM25
+        build is not cached, so later searches retry it.
+        
+        Args:
+            index: VectorStoreIndex instance
+            chroma_collection: ChromaDB collection
+            top_k: Number of top results
+            use_bm25: Whether to fuse BM25 results in
+            
+        Returns:
+            Tuple of (vector_retriever, final_retriever)
+        """
+        cache_key = (self._bm25_version, top_k, use_bm25)
+        with self._retriever_lock:
+            cached = self._retriever_cache.get(cache_key)
+            if cached is not None:
+                self._retriever_cache.move_to_end(cache_key)
+                return cached
+        
+        retriever_vector, retriever_bm25 = self._get_retrievers(
+            index,
+            chroma_collection,
+            top_k,
+            use_bm25=use_bm25
+        )
+        
+        # Create fusion retriever
+        if use_bm25:
+            final_retriever = self._create_fusion_retriever(
+                retriever_vector,
+                retriever_bm25,
+                top_k
+            )
+        else:
+            final_retriever = retriever_vector
+        
+        retrievers = (retriever_vector, final_retriever)
+        if use_bm25 and retriever_bm25 is None:
+            return retrievers
+        
+        with self._retriever_lock:
+            self._retriever_cache[cache_key] = retrievers
+            self._retriever_cache.move_to_end(cache_key)
+            # Two entries (with and without BM25) per cached top_k
+            while len(self._retriever_cache) > BM25_CACHE_SIZE * 2:
+                self._retriever_cache.popitem(last=False)
+        return retrievers
+    
     def _create_fusion_retriever(
         self,
         retriever_vector,
@@ -199,12 +687,14 @@ class HybridSearchEngine:
             return retriever_vector
         
         try:
-            # Combine results from both retrievers using reciprocal rank fusion
-            retriever_fusion = QueryFusionRetriever(
+            # Combine results from both retrievers using weighted reciprocal rank fusion
+            retriever_fusion = BM25ScoreFusionRetriever(
                 [retriever_vector, retriever_bm25],
-                similarity_top_k=top_k * VECTOR_MULTIPLIER,  # Fetch candidates for reranking
+                bm25_position=1,
+                retriever_weights=[FUSION_DENSE_WEIGHT, 1.0 - FUSION_DENSE_WEIGHT],
+                similarity_top_k=_candidate_count(top_k, VECTOR_MULTIPLIER),  # Fetch candidates for reranking
                 num_queries=1,
-                mode="reciprocal_rank",
+                mode=FUSION_MODES.RECIPROCAL_RANK,  # weighted sum of 1 / (60 + rank)
                 use_async=False,
                 verbose=True
             )
@@ -215,7 +705,11 @@ class HybridSearchEngine:
     
     def _create_reranker(self, top_k: int):
         """
-        Create reranker for post-processing results.
+        Get a reranker for post-processing results.
+        
+        The cross-encoder is loaded on first use only. Each distinct top_n gets
+        a shallow copy sharing that model, so concurrent searches with different
+        top_k never mutate a reranker another search is using.
         
         Args:
             top_k: Number of final results after reranking
@@ -223,15 +717,167 @@ class HybridSearchEngine:
         Returns:
             SentenceTransformerRerank instance or None if creation fails
         """
-        try:
-            reranker = SentenceTransformerRerank(
-                model=self.reranker_model,
-                top_n=int(top_k * RERANK_TOP_N_RATIO)
-            )
+        top_n = int(top_k * RERANK_TOP_N_RATIO)
+        with self._reranker_lock:
+            reranker = self._reranker_cache.get(top_n)
+            if reranker is not None:
+                return reranker
+            
+            try:
+                if self._reranker_cache:
+                    base = next(iter(self._reranker_cache.values()))
+                    reranker = base.model_copy(update={"top_n": top_n})
+                else:
+                    reranker = self._load_reranker(top_n)
+            except Exception as e:
+                logger.warning(f"Failed to create reranker: {e}")
+                return None
+            
+            self._reranker_cache[top_n] = reranker
             return reranker
+    
+    def _load_reranker(self, top_n: int) -> SentenceTransformerRerank:
+        """
+        Load the cross-encoder, preferring the configured ONNX/OpenVINO backend.
+        
+        Args:
+            top_n: Number of final results after reranking
+            
+        Returns:
+            SentenceTransformerRerank instance
+        """
+        options = {
+            "model": self.reranker_model,
+            "top_n": top_n,
+            "retrieval_weight": RERANK_ALPHA,
+            "max_candidates": RERANK_MAX_CANDIDATES,
+            "bm25_in_input": RERANK_BM25_IN_INPUT,
+            "score_cache_size": RERANK_SCORE_CACHE_SIZE
+        }
+        
+        if RERANKER_BACKEND != "torch":
+            try:
+                backend_kwargs = {"file_name": RERANKER_ONNX_FILE} if RERANKER_ONNX_FILE else {}
+                reranker = BackendRerank(
+                    backend=RERANKER_BACKEND,
+                    model_kwargs=backend_kwargs,
+                    **options
+                )
+                logger.info(f"Reranker loaded with {RERANKER_BACKEND} backend")
+                return reranker
+            except Exception as e:
+                logger.warning(
+                    f"{RERANKER_BACKEND} reranker backend not available: {e}. "
+                    "Falling back to PyTorch."
+                )
+        
+        return BackendRerank(backend="torch", **options)
+    
+    def _load_index(self, chroma_collection):
+        """
+        Load the persisted index on top of the ChromaDB collection.
+        
+        Args:
+            chroma_collection: ChromaDB collection
+            
+        Returns:
+            VectorStoreIndex instance
+        """
+        vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
+        storage_context = StorageContext.from_defaults(
+            vector_store=vector_store,
+            persist_dir=self.storage_path
+        )
+        
+        return load_index_from_storage(
+            storage_context,
+            embed_model=self.embed_model
+        )
+    
+    def get_collection(self):
+        """
+        Get the ChromaDB collection handle, looking it up only until it exists.
+        
+        Each get_collection call on the client is a metadata round trip;
+        concurrent first calls may both look it up, which is harmless.
+        
+        Returns:
+            ChromaDB collection
+            
+        Raises:
+            ValueError: If the collection does not exist
+        """
+        chroma_collection = self._collection
+        if chroma_collection is None:
+            chroma_collection = self.chroma_client.get_collection(self.collection_name)
+            self._collection = chroma_collection
+        return chroma_collection
+    
+    def _get_index(self) -> Tuple[Any, Any]:
+        """
+        Get the ChromaDB collection and index, loading them once per index version.
+        
+        Returns:
+            Tuple of (chroma_collection, index)
+            
+        Raises:
+            ValueError: If the collection does not exist
+        """
+        with self._index_lock:
+            version = self._bm25_version
+            if self._index_cache is None or self._index_cache[0] != version:
+                chroma_collection = self.get_collection()
+                index = self._load_index(chroma_collection)
+                self._index_cache = (version, chroma_collection, index)
+            _, chroma_collection, index = self._index_cache
+        return chroma_collection, index
+    
+    def prebuild_bm25(self, top_k: int = DEFAULT_TOP_K) -> bool:
+        """
+        Build, persist, and cache the BM25 retriever ahead of the first search.
+        
+        Intended to run right after an index refresh, so the first search
+        neither reads the collection back nor tokenizes the corpus.
+        
+        Args:
+            top_k: Number of results the retriever is prepared for
+            
+        Returns:
+            True if a BM25 retriever is ready, False otherwise
+        """
+        try:
+            chroma_collection, index = self._get_index()
+            with self._bm25_lock:
+                retriever = self._build_bm25_retriever(index, chroma_collection, top_k)
         except Exception as e:
-            logger.warning(f"Failed to create reranker: {e}")
-            return None
+            logger.warning(f"Failed to prebuild BM25 retriever: {e}")
+            return False
+        
+        return retriever is not None
+    
+    def warmup(self) -> bool:
+        """
+        Load the reranker and run the embedding model and reranker once.
+        
+        Intended to run in the background at server start, so the first
+        search does not pay for reading weights, backend session setup, or
+        CUDA context creation. Both models stay on the device they picked.
+        
+        Returns:
+            True if both models ran, False otherwise
+        """
+        try:
+            self.embed_model.get_query_embedding("warmup")
+            reranker = self._create_reranker(DEFAULT_TOP_K)
+            if reranker is None:
+                return False
+            reranker.warmup()
+        except Exception as e:
+            logger.warning(f"Failed to warm up search models: {e}")
+            return False
+        
+        logger.info("Search models warmed up")
+        return True
     
     def search(self, query: str, top_k: int = DEFAULT_TOP_K) -> SearchResult:
         """
@@ -245,9 +891,9 @@ class HybridSearchEngine:
             SearchResult object with response and source nodes
         """
         try:
-            # Check if collection exists
+            # Check if collection exists and load the index (cached)
             try:
-                chroma_collection = self.chroma_client.get_collection(self.collection_name)
+                chroma_collection, index = self._get_index()
             except ValueError:
                 return SearchResult(
                     response_text="",
@@ -256,30 +902,17 @@ class HybridSearchEngine:
                     error="Index does not exist. Please run 'refresh_index' first."
                 )
             
-            # Load index
-            vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
-            storage_context = StorageContext.from_defaults(
-                vector_store=vector_store,
-                persist_dir=self.storage_path
-            )
-            
-            index = load_index_from_storage(
-                storage_context,
-                embed_model=self.embed_model
-            )
+            # Pure-paraphrase queries skip BM25 scoring entirely
+            use_bm25 = self._has_lexical_anchors(query)
+            if not use_bm25:
+                logger.info("Query has no lexical anchors; using vector search only")
             
-            # Get retrievers
-            retriever_vector, retriever_bm25 = self._get_retrievers(
+            # Get retrievers (cached per index version and top_k)
+            retriever_vector, final_retriever = self._get_search_retrievers(
                 index,
                 chroma_collection,
-                top_k
-            )
-            
-            # Create fusion retriever
-            final_retriever = self._create_fusion_retriever(
-                retriever_vector,
-                retriever_bm25,
-                top_k
+                top_k,
+                use_bm25
             )
             
             # Create reranker
@@ -302,14 +935,18 @@ class HybridSearchEngine:
                     f"Query engine failed (likely missing LLM): {e}. "
                     "Returning retrieval results only."
                 )
-                source_nodes = retriever_vector.retrieve(query)
+                # The final retriever fuses BM25 and vector ranks (RRF) when available
+                source_nodes = final_retriever.retrieve(query)
                 
-                # Apply reranker manually if available
+                # Apply reranker manually if available; without one, the
+                # oversampled candidate pool is cut back to the requested top_k
                 if reranker and source_nodes:
                     source_nodes = reranker.postprocess_nodes(
                         source_nodes,
                         query_bundle=QueryBundle(query)
                     )
+                else:
+                    source_nodes = source_nodes[:top_k]
                 
                 response_text = "⚠️ LLM not configured or failed. Showing retrieved documents only."
             
@@ -328,6 +965,26 @@ class HybridSearchEngine:
                 error=str(e)
             )
     
+    @staticmethod
+    def _format_source(node) -> str:
+        """
+        Format one source line for the search response.
+        
+        Args:
+            node: NodeWithScore or bare node
+            
+        Returns:
+            Source line with file path, score, and defined types
+        """
+        # Handle NodeWithScore or TextNode
+        n = getattr(node, 'node', node)
+        score = getattr(node, 'score', None)
+        score_text = "N/A" if score is None else f"{score:.4f}"
+        
+        metadata = n.metadata
+        types = metadata.get('defined_types', '')
+        return f"- {metadata.get('file_path', 'Unknown')} (Score: {score_text}) {f'[{types}]' if types else ''}"
+    
     def format_search_results(self, result: SearchResult) -> str:
         """
         Format search results for display.
@@ -341,20 +998,6 @@ class HybridSearchEngine:
         if not result.success:
             return f"❌ Error during search: {result.error}"
         
-        # Build sources list
-        sources_list = []
-        for node in result.source_nodes:
-            # Handle NodeWithScore or TextNode
-            n = node.node if hasattr(node, 'node') else node
-            score = f"{node.score:.4f}" if hasattr(node, 'score') and node.score is not None else "N/A"
-            
-            file_path = n.metadata.get('file_path', 'Unknown')
-            types = n.metadata.get('defined_types', '')
-            
-            sources_list.append(
-                f"- {file_path} (Score: {score}) {f'[{types}]' if types else ''}"
-            )
-        
-        sources = "\n".join(sources_list)
+        sources = "\n".join([self._format_source(node) for node in result.source_nodes])
         
         return f"{result.response_text}\n\n📂 Source Files:\n{sources}"
@@ -9,12 +9,12 @@ Provides semantic code search over the Mutagen codebase using:
 Refactored for improved maintainability and testability.
 """
 import asyncio
+import threading
 from pathlib import Path
 from typing import Union, List
 
 from fastmcp import FastMCP
 from llama_index.core import Settings
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 import chromadb
 
 # Import refactored modules
@@ -23,16 +23,32 @@ from config import (
     STORAGE_PATH,
     COLLECTION_NAME,
     EMBEDDING_MODEL_NAME,
+    EMBEDDING_BACKEND,
+    EMBEDDING_ONNX_FILE,
+    EMBEDDING_QUANTIZATION,
+    EMBEDDING_QUANTIZED_DIR,
+    EMBEDDING_BATCH_SIZE,
     CHUNK_LINES,
     CHUNK_OVERLAP_LINES,
-    MAX_CHARS
+    MAX_CHARS,
+    CODE_SPLIT_MAX_WORKERS,
+    CHUNK_CACHE_DIR,
+    CHUNK_CACHE_MAX_AGE_DAYS,
+    WARMUP_MODELS
 )
 from logging_config import setup_logging, get_logger
+from embedding import DynamicBatchingEmbedding, prepare_quantized_model
 from index_manager import IndexManager
 from search_engine import HybridSearchEngine
 
+# Process pools started by a refresh (forkserver/spawn) re-run this module as
+# __mp_main__ in their workers, which only read files and extract metadata:
+# they must not set up logging, load models, or open the database
+_IS_POOL_WORKER = __name__ == "__mp_main__"
+
 # Initialize logging
-setup_logging()
+if not _IS_POOL_WORKER:
+    setup_logging()
 logger = get_logger(__name__)
 
 # ============================================================================
@@ -42,17 +58,20 @@ logger = get_logger(__name__)
 # Try to use CodeSplitter for C#-aware chunking
 # Falls back to default splitting if tree-sitter is unavailable
 try:
-    from llama_index.core.node_parser import CodeSplitter
+    from code_splitter import FastCodeSplitter
     
-    code_splitter = CodeSplitter(
+    code_splitter = FastCodeSplitter(
         language="c_sharp",
         chunk_lines=CHUNK_LINES,
         chunk_lines_overlap=CHUNK_OVERLAP_LINES,
         max_chars=MAX_CHARS,
+        cache_dir=str(Path(STORAGE_PATH) / CHUNK_CACHE_DIR) if CHUNK_CACHE_DIR else None,
+        num_workers=CODE_SPLIT_MAX_WORKERS,
+        cache_max_age_days=CHUNK_CACHE_MAX_AGE_DAYS,
     )
     transformations_list = [code_splitter]
     logger.info("CodeSplitter (C#) initialized successfully")
-except ImportError as e:
+except (ImportError, LookupError) as e:
     logger.warning(
         f"Tree-sitter or CodeSplitter not available: {e}. "
         "Falling back to default splitting."
@@ -69,35 +88,149 @@ mcp = FastMCP(
     dependencies=["fastmcp", "llama-index", "chromadb"]
 )
 
-# Initialize embedding model
-embed_model = HuggingFaceEmbedding(model_name=EMBEDDING_MODEL_NAME)
+def _load_embed_model() -> DynamicBatchingEmbedding:
+    """
+    Load the embedding model on the configured backend.
+    
+    Prefers an ONNX Runtime / OpenVINO backend (fused kernels, no eager
+    PyTorch overhead) and falls back to the default PyTorch backend if it
+    cannot load.
+    
+    Returns:
+        DynamicBatchingEmbedding instance
+    """
+    if EMBEDDING_BACKEND != "torch":
+        model_name, onnx_file = EMBEDDING_MODEL_NAME, EMBEDDING_ONNX_FILE
+        
+        # Optionally swap in a dynamically int8-quantized export (VNNI/AVX2 kernels)
+        if EMBEDDING_BACKEND == "onnx" and EMBEDDING_QUANTIZATION and not onnx_file:
+            try:
+                model_name, onnx_file = prepare_quantized_model(
+                    EMBEDDING_MODEL_NAME,
+                    EMBEDDING_QUANTIZATION,
+                    str(Path(STORAGE_PATH) / EMBEDDING_QUANTIZED_DIR)
+                )
+            except Exception as e:
+                logger.warning(f"Int8 quantization not available: {e}. Using the float ONNX model.")
+        
+        try:
+            backend_kwargs = {"file_name": onnx_file} if onnx_file else {}
+            model = DynamicBatchingEmbedding(
+                model_name=model_name,
+                embed_batch_size=EMBEDDING_BATCH_SIZE,
+                backend=EMBEDDING_BACKEND,
+                model_kwargs=backend_kwargs
+            )
+            logger.info(f"Embedding model loaded with {EMBEDDING_BACKEND} backend")
+            return model
+        except Exception as e:
+            logger.warning(
+                f"{EMBEDDING_BACKEND} embedding backend not available: {e}. "
+                "Falling back to PyTorch."
+            )
+    
+    return DynamicBatchingEmbedding(
+        model_name=EMBEDDING_MODEL_NAME,
+        embed_batch_size=EMBEDDING_BATCH_SIZE
+    )
 
-# Initialize ChromaDB client (persistent)
-chroma_client = chromadb.PersistentClient(path=STORAGE_PATH)
 
-# Initialize index manager
-index_manager = IndexManager(
-    chroma_client=chroma_client,
-    embed_model=embed_model,
-    transformations_list=transformations_list,
-    storage_path=STORAGE_PATH,
-    collection_name=COLLECTION_NAME
-)
+if not _IS_POOL_WORKER:
+    # Initialize embedding model
+    embed_model = _load_embed_model()
+    
+    # Initialize ChromaDB client (persistent)
+    chroma_client = chromadb.PersistentClient(path=STORAGE_PATH)
+    
+    # Initialize index manager
+    index_manager = IndexManager(
+        chroma_client=chroma_client,
+        embed_model=embed_model,
+        transformations_list=transformations_list,
+        storage_path=STORAGE_PATH,
+        collection_name=COLLECTION_NAME
+    )
+    
+    # Initialize search engine
+    search_engine = HybridSearchEngine(
+        chroma_client=chroma_client,
+        embed_model=embed_model,
+        storage_path=STORAGE_PATH,
+        collection_name=COLLECTION_NAME
+    )
+
+
+def start_warmup() -> None:
+    """
+    Warm up the search models in the background, if WARMUP_MODELS is set.
+    
+    Called by the entry point rather than at import, so importing the module
+    (tests, scripts, pool workers) never spends CPU loading models. The MCP
+    handshake is not delayed; a search arriving first shares the reranker load.
+    """
+    if WARMUP_MODELS:
+        threading.Thread(
+            target=search_engine.warmup,
+            name="model-warmup",
+            daemon=True
+        ).start()
 
-# Initialize search engine
-search_engine = HybridSearchEngine(
-    chroma_client=chroma_client,
-    embed_model=embed_model,
-    storage_path=STORAGE_PATH,
-    collection_name=COLLECTION_NAME
-)
 
 # ============================================================================
 # MCP Tools
 # ============================================================================
 
+# Refreshes run in worker threads, so nothing else serializes them: two at once
+# would interleave upserts with clear_persisted_bm25 and the BM25 rebuild
+_refresh_lock = threading.Lock()
+
+
+def _prebuild_bm25() -> None:
+    """
+    Build and persist BM25 for the refreshed index, as part of the refresh.
+    """
+    with _refresh_lock:
+        search_engine.prebuild_bm25()
+
+
+def _run_refresh(paths_input: Union[str, List[str]]) -> dict:
+    """
+    Rebuild the index and reset the search engine around it.
+    
+    A refresh requested while another one (or its BM25 prebuild) is running
+    waits for it to finish.
+    
+    Args:
+        paths_input: Comma/newline separated repository paths, or a list of paths
+        
+    Returns:
+        Result dictionary from IndexManager.refresh_index
+    """
+    with _refresh_lock:
+        # Clear search engine cache
+        search_engine.clear_cache()
+        
+        # Perform index refresh
+        result = index_manager.refresh_index(paths_input)
+        
+        # Drop anything a concurrent search cached mid-refresh
+        search_engine.clear_cache()
+    
+    # Build and persist BM25 in the background so the summary returns without
+    # waiting; a search arriving mid-build blocks on the BM25 lock and reuses
+    # the result
+    if result["success"]:
+        threading.Thread(
+            target=_prebuild_bm25,
+            name="bm25-prebuild",
+            daemon=True
+        ).start()
+    
+    return result
+
+
 @mcp.tool()
-def refresh_index(
+async def refresh_index(
     repo_path: Union[str, List[str], None] = None,
     repo_paths: Union[str, List[str], None] = None
 ) -> str:
@@ -127,17 +260,12 @@ def refresh_index(
     if paths_input is None:
         paths_input = MUTAGEN_REPO_PATH
     
-    # Convert list to comma-separated string if needed
-    if isinstance(paths_input, list):
-        paths_input = ",".join(paths_input)
-    
+    # Lists are passed through as-is; IndexManager splits strings itself
     logger.info(f"Starting index refresh for: {paths_input}")
     
-    # Clear search engine cache
-    search_engine.clear_cache()
-    
-    # Perform index refresh
-    result = index_manager.refresh_index(paths_input)
+    # Refresh in a worker thread: a sync tool would run on the event loop and
+    # stall every search_repository / get_index_stats call until it finished
+    result = await asyncio.to_thread(_run_refresh, paths_input)
     
     # Format response
     if result["success"]:
@@ -153,11 +281,14 @@ def refresh_index(
         num_repos = result.get("num_repos", 1)
         total_repos = len(result.get("path_stats", {}))
         
+        skipped = result.get("skipped_records", 0)
+        skipped_line = f"\n⚠️  Chunks rejected by ChromaDB (skipped): {skipped}" if skipped else ""
+        
         return f"""✅ Index refresh complete
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 ⏱️  Time taken: {result['elapsed_time']:.2f}s
 📄 Total handwritten files indexed: {result['indexed_files']}
-🚫 Total excluded files: {result['excluded_files']}
+🚫 Total excluded files: {result['excluded_files']}{skipped_line}
 📦 Repositories processed: {num_repos}/{total_repos}
 
 📊 Per-repository statistics:
@@ -170,7 +301,7 @@ def refresh_index(
 
 
 @mcp.tool()
-def search_repository(query: str, top_k: int = 10) -> str:
+async def search_repository(query: str, top_k: int = 10) -> str:
     """
     Searches the Mutagen repository index for relevant code snippets.
     
@@ -188,8 +319,9 @@ def search_repository(query: str, top_k: int = 10) -> str:
     """
     logger.info(f"Searching for: {query} (top_k={top_k})")
     
-    # Perform search
-    result = search_engine.search(query, top_k)
+    # Perform search in a worker thread so concurrent searches can overlap
+    # (and share query-embedding batches) without blocking the event loop
+    result = await asyncio.to_thread(search_engine.search, query, top_k)
     
     # Format and return results
     return search_engine.format_search_results(result)
@@ -204,7 +336,8 @@ def get_index_stats() -> str:
         Index statistics including document count and storage info
     """
     try:
-        chroma_collection = chroma_client.get_collection(COLLECTION_NAME)
+        # The search engine holds the collection handle once it exists
+        chroma_collection = search_engine.get_collection()
         count = chroma_collection.count()
         return (
             f"📊 Index Statistics\n"
@@ -223,6 +356,7 @@ def get_index_stats() -> str:
 if __name__ == "__main__":
     try:
         logger.info("Starting Mutagen RAG MCP Server...")
+        start_warmup()
         mcp.run()
     except asyncio.CancelledError:
         logger.info("Shutdown requested (CancelledError). Exiting cleanly.")
@@ -2,6 +2,7 @@
 Test to verify the fix for multi-path refresh_index parameter name issue.
 Tests both repo_path (singular) and repo_paths (plural) parameter names.
 """
+import asyncio
 import sys
 
 def get_refresh_index_function():
@@ -11,12 +12,21 @@ def get_refresh_index_function():
     # FastMCP wraps the function in a FunctionTool object
     # We need to access the underlying function
     if hasattr(refresh_index, 'fn'):
-        return refresh_index.fn
+        fn = refresh_index.fn
     elif hasattr(refresh_index, '__wrapped__'):
-        return refresh_index.__wrapped__
+        fn = refresh_index.__wrapped__
     else:
         # If it's already a function, return it
-        return refresh_index
+        fn = refresh_index
+    
+    # refresh_index is an async tool; run each call to completion
+    def run(*args, **kwargs):
+        result = fn(*args, **kwargs)
+        if asyncio.iscoroutine(result):
+            result = asyncio.run(result)
+        return result
+    
+    return run
 
 def test_repo_path_singular():
     """Test with repo_path (singular) - what AI clients use"""
@@ -51,11 +51,143 @@ def test_file_filters():
     
     # Test header filtering
     assert filterer.is_header_generated("<auto-generated> content") == True
+    assert filterer.is_header_generated("// <auto-generated/>\nclass A {}") == True
     assert filterer.is_header_generated("normal code") == False
     
     print("✅ File filters module OK")
 
 
+def test_file_filter_scan():
+    """Test directory scanning with excluded dirs and generated suffixes."""
+    import tempfile
+    from file_filters import FileFilterer
+    from pathlib import Path
+    
+    filterer = FileFilterer()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        (root / "src" / "nested").mkdir(parents=True)
+        (root / "obj").mkdir()
+        (root / "src" / "Handwritten.cs").write_text("class A {}")
+        (root / "src" / "nested" / "Deep.cs").write_text("class B {}")
+        (root / "src" / "Record.g.cs").write_text("class C {}")
+        (root / "src" / "notes.txt").write_text("not code")
+        (root / "obj" / "Build.cs").write_text("class D {}")
+        
+        found = sorted(Path(p).name for p in filterer.scan_files(root))
+        
+        assert found == ["Deep.cs", "Handwritten.cs"]
+        assert filterer.scan_files(root / "missing") == []
+        
+        mtimes = filterer.scan_files_with_mtimes(root)
+        assert sorted(mtimes) == sorted(filterer.scan_files(root))
+        assert all(mtime == Path(p).stat().st_mtime for p, mtime in mtimes.items())
+        
+        # Raw header pre-filter drops generated files without decoding them
+        (root / "src" / "Gen.cs").write_text("// <auto-generated />\nclass F {}")
+        paths = [str(root / "src" / "Gen.cs"), str(root / "src" / "Handwritten.cs")]
+        assert filterer.prefilter_by_header_raw(paths) == paths[1:]
+        
+        # Ignore files apply relative to their directory (only with pathspec)
+        import file_filters
+        if file_filters.pathspec is not None:
+            (root / ".mutagenignore").write_text("Deep.cs\n")
+            (root / "src" / ".gitignore").write_text("*.cs\n!Handwritten.cs\n")
+            (root / "src" / "Other.cs").write_text("class E {}")
+            
+            found = sorted(Path(p).name for p in filterer.scan_files(root))
+            assert found == ["Handwritten.cs"]
+            
+            # A nested negation re-includes a file a parent ignore file excluded
+            (root / "src" / "nested" / ".gitignore").write_text("!Deep.cs\n")
+            found = sorted(Path(p).name for p in filterer.scan_files(root))
+            assert found == ["Deep.cs", "Handwritten.cs"]
+    
+    print("✅ File filter scan OK")
+
+
+def _csharp_language():
+    """Return the C# language name if a tree-sitter C# grammar is installed, else None."""
+    from code_splitter import get_parser
+    
+    # get_parser resolves the pack's spelling (c_sharp or csharp) itself
+    try:
+        get_parser("c_sharp")
+        return "c_sharp"
+    except (ImportError, LookupError):
+        return None
+
+
+def test_code_splitter_matches_upstream():
+    """Test FastCodeSplitter chunks exactly like CodeSplitter, non-ASCII included."""
+    from code_splitter import FastCodeSplitter, get_parser
+    
+    language = _csharp_language()
+    if language is None:
+        print("⚠️ tree-sitter C# grammar not available, skipping code splitter test")
+        return
+    from llama_index.core.node_parser import CodeSplitter
+    
+    methods = "\n".join(
+        f"        /// <summary>レコード{i}の値を取得します（日本語コメント）</summary>\n"
+        f"        public int Get{i}(int value)\n"
+        f"        {{\n"
+        f"            // 値を検証する — ü ß 漢字\n"
+        f"            var name = \"名前{i}\";\n"
+        f"            return value + {i};\n"
+        f"        }}\n"
+        for i in range(30)
+    )
+    code = f"namespace Mutagen.Test\n{{\n    public class Records\n    {{\n{methods}    }}\n}}\n"
+    
+    for max_chars in (300, 1000, 2048):
+        upstream = CodeSplitter(language=language, parser=get_parser(language), max_chars=max_chars)
+        fast = FastCodeSplitter(language=language, max_chars=max_chars)
+        assert fast.split_text(code) == upstream.split_text(code), max_chars
+        assert fast.split_text(code.encode("ascii", "ignore").decode()) == \
+            upstream.split_text(code.encode("ascii", "ignore").decode()), max_chars
+    
+    print("✅ Code splitter equivalence OK")
+
+
+def test_chunk_cache_prune():
+    """Test that pruning deletes only chunk cache entries unused for too long."""
+    import os
+    import tempfile
+    import time
+    from pathlib import Path
+    from code_splitter import FastCodeSplitter
+    
+    language = _csharp_language()
+    if language is None:
+        print("⚠️ tree-sitter C# grammar not available, skipping chunk cache test")
+        return
+    
+    kept = "namespace A { class Kept { void Run() { } } }"
+    stale = "namespace A { class Stale { void Run() { } } }"
+    
+    with tempfile.TemporaryDirectory() as cache_dir:
+        splitter = FastCodeSplitter(language=language, cache_dir=cache_dir, cache_max_age_days=30)
+        splitter.split_text(kept)
+        splitter.split_text(stale)
+        assert len(list(Path(cache_dir).glob("*/*.json"))) == 2
+        
+        # Both entries last used 60 days ago; only "kept" is used again
+        old = time.time() - 60 * 86400
+        for text in (kept, stale):
+            os.utime(splitter._cache_path(text), (old, old))
+        splitter.split_text(kept)
+        
+        assert splitter.prune_cache() == 1
+        assert list(Path(cache_dir).glob("*/*.json")) == [splitter._cache_path(kept)]
+        
+        # Recently used entries are kept, whichever refresh used them
+        assert splitter.prune_cache() == 0
+    
+    print("✅ Chunk cache pruning OK")
+
+
 def test_metadata_extractor():
     """Test metadata extraction."""
     from metadata_extractor import MetadataExtractor
@@ -83,6 +215,229 @@ def test_metadata_extractor():
     print("✅ Metadata extractor module OK")
 
 
+def test_near_duplicate_filter():
+    """Test near-duplicate filtering (passthrough when disabled or datasketch is missing)."""
+    from types import SimpleNamespace
+    from dedup import NearDuplicateFilter
+    
+    body = " ".join(f"public void Method{i}() {{ Run({i}); }}" for i in range(50))
+    def make_docs():
+        return [
+            SimpleNamespace(id_=doc_id, text=text, metadata={"file_path": f"{doc_id}.cs"},
+                            excluded_embed_metadata_keys=[])
+            for doc_id, text in [
+                ("a", body),
+                ("b", body + " // trailing comment"),
+                ("c", "namespace Other { class Unrelated { } }"),
+            ]
+        ]
+    
+    # Off by default
+    docs = make_docs()
+    assert [d.id_ for d in NearDuplicateFilter().filter_documents(docs)] == ["a", "b", "c"]
+    
+    docs = make_docs()
+    dedup_filter = NearDuplicateFilter(enabled=True)
+    kept = [d.id_ for d in dedup_filter.filter_documents(docs)]
+    
+    if dedup_filter.enabled:
+        assert kept == ["a", "c"]
+        assert docs[0].metadata["duplicates"] == "b.cs"
+        assert "duplicates" in docs[0].excluded_embed_metadata_keys
+        assert "duplicates" not in docs[2].metadata
+    else:
+        assert kept == ["a", "b", "c"]
+    
+    print("✅ Near-duplicate filter OK")
+
+
+def test_bm25_query_gate():
+    """Test which queries are keyword-bearing enough to run BM25."""
+    from search_engine import HybridSearchEngine
+    
+    has_anchors = HybridSearchEngine._has_lexical_anchors
+    
+    # A single C# type name is the purest keyword lookup
+    assert has_anchors("Weapon")
+    assert has_anchors("Npc")
+    assert has_anchors("FormLink implementation")
+    assert has_anchors("get_record_id")
+    assert has_anchors("how records are loaded")
+    
+    # Only stopwords, or a single lowercase word: vector search only
+    assert not has_anchors("the is")
+    assert not has_anchors("The")
+    assert not has_anchors("records")
+    
+    print("✅ BM25 query gate OK")
+
+
+def test_weighted_fusion_matches_rrf():
+    """Test that equal-weight fusion reproduces QueryFusionRetriever's RRF and keeps BM25 scores."""
+    from llama_index.core.llms import MockLLM
+    from llama_index.core.retrievers import BaseRetriever, QueryFusionRetriever
+    from llama_index.core.retrievers.fusion_retriever import FUSION_MODES
+    from llama_index.core.schema import TextNode, NodeWithScore
+    from reranker import LexicalScoredNode
+    from search_engine import BM25ScoreFusionRetriever
+    
+    nodes = {name: TextNode(text=f"text {name}", id_=name) for name in "abcde"}
+    
+    class StubRetriever(BaseRetriever):
+        def __init__(self, ranked):
+            super().__init__()
+            self.ranked = ranked
+        
+        def _retrieve(self, query_bundle):
+            return [NodeWithScore(node=nodes[name], score=score) for name, score in self.ranked]
+    
+    dense = [("a", 0.9), ("b", 0.8), ("c", 0.7)]
+    bm25 = [("c", 12.0), ("d", 7.5), ("b", 3.0), ("e", 1.0)]
+    
+    def fused(retriever_class, **kwargs):
+        retriever = retriever_class(
+            [StubRetriever(dense), StubRetriever(bm25)],
+            retriever_weights=[0.5, 0.5],
+            similarity_top_k=10,
+            num_queries=1,
+            mode=FUSION_MODES.RECIPROCAL_RANK,
+            use_async=False,
+            llm=MockLLM(),  # num_queries=1 never calls it
+            **kwargs
+        )
+        return retriever.retrieve("query")
+    
+    ours = fused(BM25ScoreFusionRetriever, bm25_position=1)
+    upstream = fused(QueryFusionRetriever)
+    
+    assert [n.node.node_id for n in ours] == [n.node.node_id for n in upstream] == ["c", "b", "a", "d", "e"]
+    for mine, theirs in zip(ours, upstream):
+        assert abs(mine.score - theirs.score) < 1e-12
+    
+    # Raw BM25 scores ride along; nodes only the dense retriever found have none
+    assert all(isinstance(n, LexicalScoredNode) for n in ours)
+    assert {n.node.node_id: n.bm25_score for n in ours} == {
+        "a": None, "b": 3.0, "c": 12.0, "d": 7.5, "e": 1.0
+    }
+    
+    print("✅ Weighted fusion OK")
+
+
+def test_rerank_blends_retrieval_score():
+    """Test that the reranker blends the normalized retrieval score into the cross-encoder score."""
+    import sys
+    from types import SimpleNamespace
+    from unittest import mock
+    from llama_index.core.schema import TextNode, NodeWithScore, QueryBundle
+    from reranker import BackendRerank
+    
+    cross_scores = {"text a": 0.1, "text b": 0.9, "text c": 0.5}
+    
+    class FakeCrossEncoder:
+        def __init__(self, *args, **kwargs):
+            pass
+        
+        def predict(self, pairs, batch_size=None):
+            return [cross_scores[text] for _, text in pairs]
+    
+    def rerank(retrieval_weight):
+        nodes = [
+            NodeWithScore(node=TextNode(text=f"text {name}", id_=name), score=score)
+            for name, score in [("a", 0.03), ("b", 0.015), ("c", 0.01)]
+        ]
+        # A scripted cross-encoder, so no model (or sentence-transformers) is needed
+        fake_module = SimpleNamespace(CrossEncoder=FakeCrossEncoder)
+        with mock.patch.dict(sys.modules, {"sentence_transformers": fake_module}):
+            reranker = BackendRerank(top_n=3, retrieval_weight=retrieval_weight, device="cpu")
+        return reranker.postprocess_nodes(nodes, query_bundle=QueryBundle("query"))
+    
+    # Cross-encoder only
+    assert [n.node.node_id for n in rerank(0.0)] == ["b", "c", "a"]
+    
+    # 0.15 * (retrieval / best retrieval) + 0.85 * cross-encoder score
+    blended = rerank(0.15)
+    expected = {"a": 0.15 * 1.0 + 0.85 * 0.1, "b": 0.15 * 0.5 + 0.85 * 0.9, "c": 0.15 / 3 + 0.85 * 0.5}
+    assert [n.node.node_id for n in blended] == ["b", "c", "a"]
+    for node in blended:
+        assert abs(node.score - expected[node.node.node_id]) < 1e-9
+    
+    # A retrieval-dominated blend lets the best-retrieved node win
+    assert rerank(0.9)[0].node.node_id == "a"
+    
+    print("✅ Reranker score blending OK")
+
+
+def test_upsert_skips_rejected_record():
+    """Test that one record ChromaDB rejects is skipped, not the whole batch."""
+    from index_manager import IndexManager
+    
+    class FakeCollection:
+        def __init__(self):
+            self.written = []
+        
+        def upsert(self, ids, embeddings, documents, metadatas):
+            if "bad" in ids:
+                raise ValueError("rejected record")
+            self.written.extend(ids)
+    
+    ids = [f"id{i}" for i in range(64)]
+    ids[37] = "bad"
+    collection = FakeCollection()
+    
+    manager = IndexManager.__new__(IndexManager)
+    skipped = manager._upsert_records(
+        collection,
+        ids,
+        [[0.0]] * len(ids),
+        ["text"] * len(ids),
+        [{"file_path": f"{i}.cs"} for i in ids]
+    )
+    
+    assert skipped == 1
+    assert sorted(collection.written) == sorted(i for i in ids if i != "bad")
+    
+    print("✅ Upsert record skipping OK")
+
+
+def test_upsert_fails_when_collection_rejects_everything():
+    """Test that systemic upsert failures fail the refresh instead of skipping records."""
+    from llama_index.core.schema import TextNode
+    from index_manager import IndexManager
+    
+    class FailingCollection:
+        def __init__(self, error):
+            self.error = error
+            self.calls = 0
+        
+        def upsert(self, ids, embeddings, documents, metadatas):
+            self.calls += 1
+            raise self.error
+    
+    manager = IndexManager.__new__(IndexManager)
+    manager.upsert_batch_size = 64
+    nodes = [TextNode(text=f"record {i}", id_=f"id{i}") for i in range(64)]
+    embeddings = [[0.0]] * len(nodes)
+    
+    # Not a record rejection (e.g. a locked database): raised on the first call
+    collection = FailingCollection(OSError("database is locked"))
+    try:
+        manager._upsert_nodes(collection, nodes, embeddings)
+        assert False, "expected OSError"
+    except OSError:
+        pass
+    assert collection.calls == 1
+    
+    # Every record rejected (e.g. an embedding dimension mismatch)
+    collection = FailingCollection(ValueError("embedding dimension mismatch"))
+    try:
+        manager._upsert_nodes(collection, nodes, embeddings)
+        assert False, "expected RuntimeError"
+    except RuntimeError:
+        pass
+    
+    print("✅ Upsert systemic failure OK")
+
+
 def test_module_structure():
     """Test that all modules exist and have expected structure."""
     import config
@@ -115,7 +470,16 @@ if __name__ == "__main__":
         test_config()
         test_logging_config()
         test_file_filters()
+        test_file_filter_scan()
+        test_code_splitter_matches_upstream()
+        test_chunk_cache_prune()
         test_metadata_extractor()
+        test_near_duplicate_filter()
+        test_bm25_query_gate()
+        test_weighted_fusion_matches_rrf()
+        test_rerank_blends_retrieval_score()
+        test_upsert_skips_rejected_record()
+        test_upsert_fails_when_collection_rejects_everything()
         test_module_structure()
         
         print("\n" + "="*50)
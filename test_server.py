@@ -85,8 +85,11 @@ def test_search_without_index_fails():
         # Let's try to access the original function
         tool_func = search_repository
         if hasattr(tool_func, "fn"):
-            # It's likely a FastMCP wrapper
-            return tool_func.fn("test query")
+            # It's likely a FastMCP wrapper (search_repository is async)
+            result = tool_func.fn("test query")
+            if asyncio.iscoroutine(result):
+                result = await result
+            return result
         elif hasattr(tool_func, "run"):
              return await tool_func.run(query="test query")
         else:
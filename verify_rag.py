@@ -1,54 +1,202 @@
-import sys
+import argparse
+import asyncio
+import functools
+import json
 import os
 from pathlib import Path
 
-# Add current directory to sys.path
-sys.path.append(os.getcwd())
+from config import STORAGE_PATH
 
-from server import refresh_index, search_repository
+# Fingerprint of the last successfully indexed (repo, code) state
+STATE_FILE = Path(__file__).resolve().parent / ".verify_rag_state.json"
 
-def main():
+
+@functools.lru_cache(maxsize=None)
+def load_tools():
+    """
+    Import the MCP server on first use and return its tool coroutines.
+    
+    Importing server loads the embedding model, so it is deferred until a
+    refresh or search actually runs (--dry-run never pays for it).
+    FastMCP wraps tools in FunctionTool objects; the underlying coroutines
+    are returned as (refresh_index, search_repository).
+    """
+    import server
+    from server import refresh_index, search_repository
+    
+    # A CLI run exits long before a background Numba compile would pay off
+    server.search_engine.numba_scoring = False
+    # Load the search models in the background while a refresh runs
+    server.start_warmup()
+    return (
+        getattr(refresh_index, "fn", refresh_index),
+        getattr(search_repository, "fn", search_repository)
+    )
+
+
+def tree_fingerprint(root):
+    """
+    Cheap change detector for a directory tree: (newest mtime_ns, file count).
+    Uses one os.scandir pass and the stat cached on each DirEntry.
+    """
+    newest = 0
+    count = 0
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name != ".git":
+                            stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        newest = max(newest, entry.stat(follow_symlinks=False).st_mtime_ns)
+                        count += 1
+        except OSError:
+            continue
+    return [newest, count]
+
+
+def index_fingerprint(repo_path):
+    """
+    Fingerprint both the repository and this package's own modules, so an
+    indexer change triggers a refresh just like a source change does.
+    """
+    package_dir = Path(__file__).resolve().parent
+    code_mtimes = [p.stat().st_mtime_ns for p in package_dir.glob("*.py")]
+    return {
+        "repo": str(Path(repo_path).resolve()),
+        "tree": tree_fingerprint(repo_path),
+        "code": max(code_mtimes, default=0)
+    }
+
+
+def refresh_if_changed(repo_path, force=False):
+    """
+    Run refresh_index unless the fingerprint matches the last successful run.
+    
+    Returns the refresh summary, or None when the refresh was skipped.
+    """
+    fingerprint = index_fingerprint(repo_path)
+    if not force and os.path.isdir(STORAGE_PATH) and STATE_FILE.is_file():
+        try:
+            if json.loads(STATE_FILE.read_text(encoding="utf-8")) == fingerprint:
+                print(f"Index is up to date for {repo_path}; skipping refresh_index (use --force)")
+                return None
+        except (OSError, ValueError):
+            pass
+    
+    refresh_index, _ = load_tools()
+    result = asyncio.run(refresh_index(repo_path=repo_path))
+    if result.startswith("✅"):
+        STATE_FILE.write_text(json.dumps(fingerprint), encoding="utf-8")
+    return result
+
+
+def main(force=False, dry_run=False):
     print("=== Verifying RAG Improvements ===")
     
     # 1. Refresh Index
     print("\n[1] Running refresh_index...")
-    repo_path = "./Mutagen/Mutagen.Bethesda.Core"
-    if not os.path.exists(repo_path):
-        print(f"Warning: {repo_path} does not exist. Using ./Mutagen if available or skipping.")
-        if os.path.exists("./Mutagen"):
-             repo_path = "./Mutagen"
-        else:
-             print("Error: No Mutagen directory found.")
-             return
+    # Prefer the Core project, then the whole Mutagen checkout; only a missing
+    # path falls through, other errors (e.g. permissions) are reported as-is
+    for repo_path in ("./Mutagen/Mutagen.Bethesda.Core", "./Mutagen"):
+        try:
+            os.stat(repo_path)
+            break
+        except FileNotFoundError:
+            print(f"Warning: {repo_path} does not exist.")
+        except OSError as e:
+            print(f"Error: cannot access {repo_path}: {e}")
+            return
+    else:
+        print("Error: No Mutagen directory found.")
+        return
+
+    if dry_run:
+        print("OK:", repo_path)
+        return
 
     try:
-        # FastMCP tools might be callable directly
-        result = refresh_index(repo_path=repo_path)
-        print("Result:", result)
+        result = refresh_if_changed(repo_path, force)
+        if result is not None:
+            print("Result:", result)
     except Exception as e:
         print(f"Error calling refresh_index: {e}")
-        # Try accessing original function if it's a wrapper
-        if hasattr(refresh_index, 'fn'):
-            try:
-                result = refresh_index.fn(repo_path=repo_path)
-                print("Result (via .fn):", result)
-            except Exception as e2:
-                print(f"Error calling refresh_index.fn: {e2}")
 
     # 2. Search Repository
     print("\n[2] Running search_repository (Hybrid + Rerank)...")
     query = "FormLink implementation"
     try:
-        result = search_repository(query=query, top_k=3)
+        _, search_repository = load_tools()
+        result = asyncio.run(search_repository(query=query, top_k=3))
         print("Result:", result)
     except Exception as e:
         print(f"Error calling search_repository: {e}")
-        if hasattr(search_repository, 'fn'):
+
+def run_batch(queries_path, force=False, dry_run=False):
+    """
+    Run many (repo, query) verifications in this one process.
+    
+    Each line of the JSONL file is {"repo": ..., "query": ..., "top_k": ...};
+    the loaded models are reused throughout, and the index is only rebuilt
+    when the repo differs from the previous line's. With dry_run, each
+    line is only parsed and its repo checked for existence.
+    """
+    print(f"=== Verifying RAG with queries from {queries_path} ===")
+    
+    last_repo = None
+    with open(queries_path, encoding="utf-8") as f:
+        for line_num, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            repo = item.get("repo", "./Mutagen/Mutagen.Bethesda.Core")
+            query = item["query"]
+            top_k = item.get("top_k", 3)
+            
+            if dry_run:
+                status = "OK:" if os.path.isdir(repo) else "Missing:"
+                print(f"[{line_num}] {status} {repo} | {query} (top_k={top_k})")
+                continue
+            
+            if repo != last_repo:
+                print(f"\n[{line_num}] Running refresh_index for {repo}...")
+                try:
+                    result = refresh_if_changed(repo, force)
+                    if result is not None:
+                        print("Result:", result)
+                    last_repo = repo
+                except Exception as e:
+                    print(f"Error calling refresh_index: {e}")
+                    continue
+            
+            print(f"\n[{line_num}] Running search_repository: {query} (top_k={top_k})")
             try:
-                result = search_repository.fn(query=query, top_k=3)
-                print("Result (via .fn):", result)
-            except Exception as e2:
-                print(f"Error calling search_repository.fn: {e2}")
+                _, search_repository = load_tools()
+                print("Result:", asyncio.run(search_repository(query=query, top_k=top_k)))
+            except Exception as e:
+                print(f"Error calling search_repository: {e}")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Verify refresh_index and search_repository")
+    parser.add_argument(
+        "--queries",
+        help="JSONL file of {\"repo\", \"query\", \"top_k\"} lines to run in one process"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Run refresh_index even if the repository and code are unchanged"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only check repository paths (and query file lines); do not load the models"
+    )
+    args = parser.parse_args()
+    
+    if args.queries:
+        run_batch(args.queries, args.force, args.dry_run)
+    else:
+        main(args.force, args.dry_run)